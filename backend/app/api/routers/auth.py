@@ -2,7 +2,6 @@ from fastapi import APIRouter, HTTPException, Response, Request
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, Dict, Any
 from datetime import datetime, timezone, timedelta
-import json
 
 from app.auth.security import (
     hash_password, verify_password,
@@ -17,6 +16,7 @@ from app.auth.storage import (
     find_user_any,
 )
 from app.core.config import settings
+from app.services.cache import cache
 from app.auth.emailer import send_password_reset_email
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -38,28 +38,15 @@ class UserOut(BaseModel):
     linked: dict | None = None
 
 def _find_profile_by_refid(refid: str) -> Optional[Dict[str, Any]]:
-    path = settings.NDJSON_PATH
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                except Exception:
-                    continue
-                if obj.get("collection") != "profile3":
-                    continue
-                if obj.get("__refid") == refid:
-                    return {
-                        "dancerName": obj.get("dancerName"),
-                        "__refid": obj.get("__refid"),
-                        "pcbid": obj.get("pcbid"),
-                    }
-    except FileNotFoundError:
+    # último profile3 de ese refid, desde el índice del cache (sin leer el archivo)
+    obj = cache.profile_by_refid(refid)
+    if obj is None or obj.get("__refid") != refid:
         return None
-    return None
+    return {
+        "dancerName": obj.get("dancerName"),
+        "__refid": obj.get("__refid"),
+        "pcbid": obj.get("pcbid"),
+    }
 
 @router.post("/register", response_model=UserOut)
 def register(payload: RegisterIn):
@@ -0,0 +1,53 @@
+# app/api/routers/events.py
+from __future__ import annotations
+from fastapi import APIRouter, HTTPException
+from typing import Any, Dict, List, Optional
+from app.services.cache import cache
+from app.services.snapshot import Json, Snapshot
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+def dancer_name(snap: Snapshot, refid: Optional[str]) -> Optional[str]:
+    prof = snap.profiles_by_refid.get(refid) if refid else None
+    name = prof.get("dancerName") if prof else None
+    return name.strip() if isinstance(name, str) and name.strip() else None
+
+
+def refid_for(snap: Snapshot, dancer: str) -> Optional[str]:
+    """__refid del profile3 con ese dancerName (hay pocos perfiles)."""
+    for refid, prof in snap.profiles_by_refid.items():
+        name = prof.get("dancerName")
+        if isinstance(name, str) and name.strip() == dancer.strip():
+            return refid
+    return None
+
+
+def _row(snap: Snapshot, e: Json) -> Json:
+    return {**e, "dancerName": dancer_name(snap, e["refid"])}
+
+
+@router.get("")
+def dancer_events(dancer: Optional[str] = None, refid: Optional[str] = None) -> Dict[str, Any]:
+    """Progreso de eventos (event3) de un jugador, por eventId. Se pasa dancer o refid."""
+    snap = cache.snapshot()
+    if not refid:
+        if not dancer:
+            raise HTTPException(status_code=400, detail="Falta dancer o refid")
+        refid = refid_for(snap, dancer)
+    events = snap.events_by_refid.get(refid) if refid else None
+    if events is None:
+        raise HTTPException(status_code=404, detail="Sin eventos para ese jugador")
+    return {
+        "refid": refid,
+        "dancerName": dancer_name(snap, refid),
+        "events": [{k: v for k, v in e.items() if k != "refid"} for e in events],
+    }
+
+
+@router.get("/{eventId}")
+def event_standings(eventId: int) -> Dict[str, Any]:
+    """Jugadores de un evento ordenados por compTime (desc) y quién llegó primero."""
+    snap = cache.snapshot()
+    rows: List[Json] = [_row(snap, e) for e in snap.events_by_id.get(eventId, ())]
+    return {"eventId": eventId, "total": len(rows), "rows": rows}
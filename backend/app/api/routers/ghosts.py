@@ -0,0 +1,106 @@
+# app/api/routers/ghosts.py
+from __future__ import annotations
+from array import array
+from fastapi import APIRouter, HTTPException, Query
+from typing import Any, Dict, List
+from app.services.cache import cache
+from app.services.ghosts import ghost_store
+from app.services.score_store import NONE, mode_from_style
+from app.services.snapshot import Snapshot
+
+router = APIRouter(prefix="/ghosts", tags=["ghosts"])
+
+# Tope de diferencias listadas en /ghosts/compare (el conteo es siempre completo)
+MAX_DIFFS = 1000
+
+
+def _counts(steps: array) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for v in steps:
+        k = str(v)
+        out[k] = out.get(k, 0) + 1
+    return out
+
+
+@router.get("/compare")
+def compare_ghosts(
+    songId: int,
+    a: str = Query(..., description="dancerName"),
+    b: str = Query(..., description="dancerName"),
+    mode: str = Query("S", pattern="^[SD]$"),
+    difficulty: int = Query(..., ge=0, le=4),
+    source: str = Query("score3", pattern="^(score3|hiscore3)$"),
+) -> Dict[str, Any]:
+    """
+    Compara paso a paso los ghosts del MEJOR score de dos jugadores en el
+    mismo chart (songId, mode, difficulty): juicios de cada uno, cuántos
+    pasos difieren y dónde (hasta MAX_DIFFS posiciones [paso, a, b]).
+    """
+    snap = cache.snapshot()
+    key = (songId, 1 if mode == "D" else 0, difficulty)
+    sides = [_best_ghost(snap, source, key, name) for name in (a, b)]
+
+    sa, sb = sides[0].pop("_steps"), sides[1].pop("_steps")
+    n = min(len(sa), len(sb))
+    diffs: List[List[int]] = []
+    different = 0
+    for i in range(n):
+        if sa[i] != sb[i]:
+            different += 1
+            if len(diffs) < MAX_DIFFS:
+                diffs.append([i, sa[i], sb[i]])
+
+    return {
+        "songId": songId,
+        "mode": mode,
+        "difficulty": difficulty,
+        "source": source,
+        "a": sides[0],
+        "b": sides[1],
+        "compared": n,
+        "different": different,
+        "firstDifference": diffs[0][0] if diffs else None,
+        "diffs": diffs,
+    }
+
+
+def _best_ghost(snap: Snapshot, source: str, key, name: str) -> Dict[str, Any]:
+    view = snap.hiscores if source == "hiscore3" else snap.scores
+    boards = snap.hiscore_boards if source == "hiscore3" else snap.score_boards
+    did = view.strings.lookup(name)
+    board = boards.get(key)
+    best = board.best.get(did) if board is not None and did != NONE else None
+    if best is None:
+        raise HTTPException(status_code=404, detail=f"{name} no tiene score en ese chart")
+
+    row = best[2]
+    refid = view.strings.get(view.cols["refid"][row])
+    ghost_id = view.cols["ghost_id"][row]
+    steps = ghost_store.get(snap.ghosts, refid, ghost_id) if refid and ghost_id != NONE else None
+    if steps is None:
+        raise HTTPException(status_code=404, detail=f"Ghost de {name} no encontrado")
+
+    return {
+        "dancerName": name,
+        "score": best[0],
+        "mode": mode_from_style(key[1]),
+        "ghostId": ghost_id,
+        "steps": list(steps),
+        "counts": _counts(steps),
+        "_steps": steps,
+    }
+
+
+@router.get("/{refid}/{ghostId}")
+def get_ghost(refid: str, ghostId: int) -> Dict[str, Any]:
+    """Ghost decodificado: un juicio (0..9) por paso y el conteo de cada uno."""
+    steps = ghost_store.get(cache.snapshot().ghosts, refid, ghostId)
+    if steps is None:
+        raise HTTPException(status_code=404, detail="Ghost no encontrado")
+    return {
+        "refid": refid,
+        "ghostId": ghostId,
+        "size": len(steps),
+        "steps": list(steps),
+        "counts": _counts(steps),
+    }
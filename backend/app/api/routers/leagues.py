@@ -0,0 +1,46 @@
+# app/api/routers/leagues.py
+from __future__ import annotations
+from fastapi import APIRouter, HTTPException
+from typing import Any, Dict, Optional
+from app.api.routers.events import dancer_name, refid_for
+from app.services.cache import cache
+
+router = APIRouter(prefix="/leagues", tags=["leagues"])
+
+
+@router.get("")
+def list_leagues(dancer: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Períodos de liga (leagueresult3), el más reciente primero, con sus clases.
+    Con `dancer` solo los resultados que traen el __refid de ese jugador.
+    """
+    snap = cache.snapshot()
+    if dancer:
+        refid = refid_for(snap, dancer)
+        results = snap.leagues_by_refid.get(refid, ()) if refid else ()
+        return {"dancerName": dancer, "results": list(results)}
+
+    return {
+        "leagues": [
+            {
+                "leagueId": lid,
+                "classes": len(snap.leagues[lid]),
+                "ended": all(r["ended"] for r in snap.leagues[lid]),
+            }
+            for lid in sorted(snap.leagues, reverse=True)
+        ]
+    }
+
+
+@router.get("/{leagueId}")
+def league_standings(leagueId: int) -> Dict[str, Any]:
+    """Resultados de un período por clase: umbrales de ascenso/descenso y participantes."""
+    snap = cache.snapshot()
+    results = snap.leagues.get(leagueId)
+    if results is None:
+        raise HTTPException(status_code=404, detail="Liga no encontrada")
+    return {
+        "leagueId": leagueId,
+        "ended": all(r["ended"] for r in results),
+        "standings": [{**r, "dancerName": dancer_name(snap, r["refid"])} for r in results],
+    }
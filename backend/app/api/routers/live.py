@@ -0,0 +1,83 @@
+# app/api/routers/live.py
+from __future__ import annotations
+import asyncio
+from fastapi import APIRouter, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Optional
+from app.services.live import Subscription, live_hub
+
+router = APIRouter(prefix="/live", tags=["live"])
+
+# Cada cuánto se manda un keepalive por SSE si no hay eventos
+SSE_KEEPALIVE_SEC = 15.0
+
+
+@router.websocket("")
+async def live_ws(
+    ws: WebSocket,
+    dancer: Optional[str] = None,
+    songId: Optional[int] = None,
+) -> None:
+    """
+    Feed en vivo por WebSocket: un mensaje JSON por evento.
+    - {"type": "score", "row": {...}}  play nuevo (misma forma que /scores)
+    - {"type": "position", ...}        cambio de posición en un leaderboard
+    - {"type": "resync"}               volver a pedir los datos
+    Filtros opcionales: ?dancer=NOMBRE&songId=123
+    """
+    await ws.accept()
+    sub = live_hub.subscribe(dancer, songId)
+    # lee del socket solo para enterarse del cierre
+    closed = asyncio.ensure_future(_wait_closed(ws))
+    try:
+        while True:
+            nxt = asyncio.ensure_future(sub.queue.get())
+            done, _ = await asyncio.wait({nxt, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if closed in done:
+                nxt.cancel()
+                break
+            await ws.send_text(nxt.result().data)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        closed.cancel()
+        live_hub.unsubscribe(sub)
+
+
+async def _wait_closed(ws: WebSocket) -> None:
+    try:
+        while True:
+            await ws.receive_text()
+    except (WebSocketDisconnect, RuntimeError):
+        return
+
+
+@router.get("/sse")
+async def live_sse(
+    request: Request,
+    dancer: Optional[str] = None,
+    songId: Optional[int] = Query(None),
+) -> StreamingResponse:
+    """Mismo feed que /live como Server-Sent Events (event: score|position|resync)."""
+    sub = live_hub.subscribe(dancer, songId)
+    return StreamingResponse(
+        _sse_stream(request, sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _sse_stream(request: Request, sub: Subscription) -> AsyncIterator[str]:
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                ev = await asyncio.wait_for(sub.queue.get(), SSE_KEEPALIVE_SEC)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {ev.kind}\ndata: {ev.data}\n\n"
+    finally:
+        live_hub.unsubscribe(sub)
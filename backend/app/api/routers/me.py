@@ -6,8 +6,9 @@ from typing import Optional, Dict, Tuple, Any
 
 from app.auth.storage import find_user
 from app.auth.security import decode_token
-from app.services.ndjson_writer import read_profile3_fields, update_profile3_fields
-from app.services.ndjson_customize import read_customize, update_customize
+from app.services.ndjson_writer import build_profile3_line, read_profile3_fields
+from app.services.ndjson_customize import build_customize_lines, read_customize
+from app.services.write_queue import write_queue
 
 router = APIRouter(prefix="/me", tags=["me"])
 
@@ -108,12 +109,18 @@ def update_my_profile(patch: ProfilePatch, username: str = Depends(current_usern
     core_patch   = {k: v for k, v in data.items() if k in CORE_KEYS}
     custom_patch = {k: v for k, v in data.items() if k in CUSTOM_KEYS}
 
+    # profile3 y customize3 van en un mismo append (una sola escritura)
+    lines = []
     if core_patch:
-        if not update_profile3_fields(user["linked"], core_patch):
+        built = build_profile3_line(user["linked"], core_patch)
+        if not built:
             raise HTTPException(status_code=404, detail="Perfil no encontrado o sin cambios")
+        lines.append(built[0])
 
     if custom_patch:
         changes = {MAP[k]: int(v) for k, v in custom_patch.items() if k in MAP}
-        update_customize(user["linked"], changes)
+        lines.extend(build_customize_lines(user["linked"], changes)[0])
 
+    if lines:
+        write_queue.append(lines)
     return {"ok": True}
@@ -1,15 +1,56 @@
 # app/api/routers/scores.py
 from __future__ import annotations
-from fastapi import APIRouter, Query
-from typing import Any, Dict, List, Optional, Union
+import csv
+import io
+import json
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Union
+from app.core.config import settings
+from app.core.http_cache import json_response
+from app.loaders.ndjson_loader import normalize_date
 from app.services.cache import cache
+from app.services.leaderboard import ANY_DIFFICULTY, Board
+from app.services.score_index import decode_cursor
+from app.services.score_store import NONE, ScoreView, score_row
+from app.services.snapshot import Snapshot
 
 router = APIRouter(prefix="/scores", tags=["scores"])
 
+# Máximo de canciones por request en /scores/rankings
+MAX_BATCH_SONGS = 200
 
-def _mode_from_style(style: Optional[int]) -> str:
-    # 0/None => Single, 1 => Double
-    return "D" if style == 1 else "S"
+# Filas por chunk en /scores/export
+EXPORT_CHUNK_ROWS = 500
+
+CSV_COLUMNS = (
+    "source", "songId", "title", "mode", "difficulty", "level", "dancerName",
+    "score", "exScore", "clearKind", "rank", "maxCombo", "createdAt", "updatedAt",
+)
+
+
+def _score_filters(
+    view: ScoreView,
+    dancer: Optional[str],
+    songId: Optional[int],
+    mode: Optional[str],
+    difficulty: Optional[int],
+    clearKind: Optional[int],
+) -> Optional[Dict[str, Any]]:
+    """Filtros de /scores para ScoreIndex; None si el dancer no aparece en ningún score."""
+    # filtro por jugador contra la columna "dancer" (ids internados, sin resolver nombres)
+    want: Optional[int] = None
+    if dancer:
+        want = NONE if dancer == "UNKNOWN" else view.strings.lookup(dancer)
+        if want == NONE and dancer != "UNKNOWN":
+            return None
+    return {
+        "dancer": want,
+        "song": songId,
+        "style": None if mode is None else (1 if mode == "D" else 0),
+        "difficulty": difficulty,
+        "clear_kind": clearKind,
+    }
 
 
 @router.get("")
@@ -17,58 +58,157 @@ def list_scores(
     limit: int = Query(200, ge=1, le=5000),
     dancer: Optional[str] = None,
     source: str = Query("score3", pattern="^(score3|hiscore3)$"),
-) -> List[Dict[str, Any]]:
+    songId: Optional[int] = None,
+    mode: Optional[str] = Query(None, pattern="^[SD]$"),
+    difficulty: Optional[int] = Query(None, ge=0, le=4),
+    clearKind: Optional[int] = None,
+    sort: str = Query("score", pattern="^(score|exScore|date)$"),
+    cursor: Optional[str] = None,
+) -> Response:
     """
-    Devuelve scores enriquecidos con songMeta (incluye basename) y dancerName
-    recuperado desde profile3 cuando el score no lo trae.
+    Devuelve los TOP `limit` scores (por score, exScore o fecha) enriquecidos
+    con songMeta (incluye basename) y dancerName recuperado desde profile3
+    cuando el score no lo trae.
+
+    Paginación por cursor: si hay más filas, el header X-Next-Cursor trae el
+    valor a pasar como `cursor` para pedir la página siguiente.
     """
-    cache.load_if_changed()
-    raw = cache.hiscores if source == "hiscore3" else cache.scores
+    snap = cache.snapshot()
+    view = snap.hiscores if source == "hiscore3" else snap.scores
+    index = snap.hiscore_index if source == "hiscore3" else snap.score_index
 
-    out: List[Dict[str, Any]] = []
-    for s in raw:
-        # Nombre del jugador: del score o del profile3
-        dn = cache.dancer_name_for(s) or "UNKNOWN"
-        if dancer and dn != dancer:
-            continue
-
-        song_id = s.get("songId")
-
-        row: Dict[str, Any] = {
-            "source": source,
-            "songId": song_id,
-            "style": s.get("style"),
-            "mode": _mode_from_style(s.get("style")),
-            "difficulty": s.get("difficulty"),
-            "dancerName": dn,
-            "score": s.get("score"),
-            "clearKind": s.get("clearKind"),
-            "exScore": s.get("exScore"),
-            "maxCombo": s.get("maxCombo"),
-            "rank": s.get("rank"),
-            "createdAt": s.get("createdAt"),
-            "updatedAt": s.get("updatedAt"),
-        }
-
-        meta = cache.song_meta(song_id)
-        if meta:
-            row["songMeta"] = {
-                "title": meta.get("title"),
-                "name": meta.get("name") or meta.get("title"),
-                "basename": meta.get("basename"),
-                "series": meta.get("series"),
-                "bpm": meta.get("bpm"),
-                "diffLv": meta.get("diffLv"),
-            }
-        else:
-            row["songMeta"] = None
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="cursor inválido")
 
-        out.append(row)
-        if len(out) >= limit:
-            break
+    filters = _score_filters(view, dancer, songId, mode, difficulty, clearKind)
+    if filters is None:
+        return json_response([])   # nombre que no aparece en ningún score
 
-    out.sort(key=lambda r: r.get("score") or 0, reverse=True)
-    return out
+    rows, next_cursor = index.query(view, limit, sort=sort, cursor=after, **filters)
+
+    songs_meta = snap.songs_meta
+    out = [score_row(view, i, source, songs_meta) for i in rows]
+    # se serializa acá directo (sin validación de FastAPI): hasta 5000 filas
+    return json_response(out, {"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+
+@router.get("/export")
+def export_scores(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    dancer: Optional[str] = None,
+    source: str = Query("score3", pattern="^(score3|hiscore3)$"),
+    songId: Optional[int] = None,
+    mode: Optional[str] = Query(None, pattern="^[SD]$"),
+    difficulty: Optional[int] = Query(None, ge=0, le=4),
+    clearKind: Optional[int] = None,
+    sort: str = Query("score", pattern="^(score|exScore|date)$"),
+) -> StreamingResponse:
+    """
+    Historial completo (sin límite) en NDJSON o CSV, con los mismos filtros
+    que /scores. Se genera por tramos desde un snapshot: la memoria no
+    crece con el tamaño del resultado y la respuesta va en chunks.
+    """
+    snap = cache.snapshot()
+    view = snap.hiscores if source == "hiscore3" else snap.scores
+    index = snap.hiscore_index if source == "hiscore3" else snap.score_index
+
+    filters = _score_filters(view, dancer, songId, mode, difficulty, clearKind)
+    rows = index.scan(view, sort=sort, **filters) if filters is not None else iter(())
+
+    if format == "csv":
+        body = _export_csv(view, rows, source, snap.songs_meta)
+        media_type = "text/csv; charset=utf-8"
+    else:
+        body = _export_ndjson(view, rows, source, snap.songs_meta)
+        media_type = "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="scores-{source}.{format}"'},
+    )
+
+
+def _export_ndjson(view: ScoreView, rows: Iterator[int], source: str, songs_meta: Mapping[int, Any]) -> Iterator[bytes]:
+    buf: List[str] = []
+    for i in rows:
+        buf.append(json.dumps(score_row(view, i, source, songs_meta), ensure_ascii=False, separators=(",", ":")))
+        if len(buf) >= EXPORT_CHUNK_ROWS:
+            yield ("\n".join(buf) + "\n").encode("utf-8")
+            buf.clear()
+    if buf:
+        yield ("\n".join(buf) + "\n").encode("utf-8")
+
+
+def _export_csv(view: ScoreView, rows: Iterator[int], source: str, songs_meta: Mapping[int, Any]) -> Iterator[bytes]:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(CSV_COLUMNS)
+    n = 0
+    for i in rows:
+        r = score_row(view, i, source, songs_meta)
+        meta = r["songMeta"] or {}
+        writer.writerow([
+            source,
+            r["songId"],
+            meta.get("title"),
+            r["mode"],
+            r["difficulty"],
+            _level(meta, r["mode"], r["difficulty"]),
+            r["dancerName"],
+            r["score"],
+            r["exScore"],
+            r["clearKind"],
+            r["rank"],
+            r["maxCombo"],
+            normalize_date(r["createdAt"]),
+            normalize_date(r["updatedAt"]),
+        ])
+        n += 1
+        if n % EXPORT_CHUNK_ROWS == 0:
+            yield out.getvalue().encode("utf-8")
+            out.seek(0)
+            out.truncate()
+    if out.tell():
+        yield out.getvalue().encode("utf-8")
+
+
+def _level(meta: Dict[str, Any], mode: str, difficulty: Optional[int]) -> Optional[int]:
+    """Nivel del chart desde diffLv (0..4 Single, 5..9 Double), como en el frontend."""
+    lv = meta.get("diffLv")
+    if not isinstance(lv, list) or difficulty is None or not 0 <= difficulty <= 4:
+        return None
+    idx = difficulty + (5 if mode == "D" else 0)
+    val = lv[idx] if idx < len(lv) else None
+    return val if val else None
+
+
+@router.get("/unified")
+def unified_scores(
+    dancer: Optional[str] = None,
+    songId: Optional[int] = None,
+    raw: bool = False,
+) -> Response:
+    """
+    score3 unificado: un registro por chart y dancer (su mejor score), con
+    dancerName rellenado desde profile3, grade y songMeta. Ordenado por score.
+    Sale del Unifier del snapshot (se mantiene al ingerir) y la lista se arma
+    una vez por versión. `raw=true` agrega el documento original de cada
+    registro releyendo su línea del NDJSON; esa respuesta no se guarda en el
+    cache de respuestas (ver UNSTORED en http_cache).
+    """
+    snap = cache.snapshot()
+    if raw:
+        rows = snap.unified.rows(snap.songs_by_mcode, raw_path=settings.NDJSON_PATH)
+    else:
+        rows = snap.unified.cached_rows(snap.songs_by_mcode, snap.songs_version)
+    if dancer or songId is not None:
+        rows = [
+            r for r in rows
+            if (not dancer or r["dancerName"] == dancer) and (songId is None or r["songId"] == songId)
+        ]
+    return json_response(rows)
 
 
 @router.get("/ranking")
@@ -76,51 +216,89 @@ def song_ranking(
     songId: Union[int, str],
     source: str = Query("score3", pattern="^(score3|hiscore3)$"),
     limit: int = Query(5, ge=1, le=50),
+    difficulty: Optional[int] = Query(None, ge=0, le=4),
 ) -> Dict[str, Any]:
     """
     Ranking por canción: TOP N Single y TOP N Double.
-    Para cada jugador conserva su MEJOR score por modo en esa canción.
+    Para cada jugador conserva su MEJOR score por modo en esa canción
+    (o en esa dificultad si se pasa `difficulty`).
+    Se arma desde el índice de leaderboards del snapshot, sin escanear scores.
+    """
+    snap = cache.snapshot()
+    view = snap.hiscores if source == "hiscore3" else snap.scores
+    boards = snap.hiscore_boards if source == "hiscore3" else snap.score_boards
+
+    try:
+        sid = int(songId)
+    except Exception:
+        sid = NONE
+
+    diff = ANY_DIFFICULTY if difficulty is None else difficulty
+    single = _board_rows(view, boards.get((sid, 0, diff)), "S", limit)
+    double = _board_rows(view, boards.get((sid, 1, diff)), "D", limit)
+
+    return {
+        "songId": songId,
+        "songMeta": _ranking_meta(snap, songId),
+        "single": single,
+        "double": double,
+    }
+
+
+@router.get("/rankings")
+def song_rankings(
+    songIds: List[str] = Query(..., description="ids separados por coma o repetidos"),
+    source: str = Query("score3", pattern="^(score3|hiscore3)$"),
+    limit: int = Query(5, ge=1, le=50),
+    modes: str = Query("S,D", pattern="^[SD](,[SD])?$"),
+    difficulties: Optional[str] = Query(None, pattern="^[0-4](,[0-4])*$"),
+) -> Response:
     """
-    cache.load_if_changed()
-    raw = cache.hiscores if source == "hiscore3" else cache.scores
-
-    def _same_song(v: Any) -> bool:
-        return str(v) == str(songId)
-
-    # agrupa mejor score por (modo, jugador)
-    best_by_player: Dict[str, Dict[str, Any]] = {}   # clave: "S|dancer", "D|dancer"
-
-    for s in raw:
-        if not _same_song(s.get("songId")):
-            continue
-
-        mode = _mode_from_style(s.get("style"))
-        dn = cache.dancer_name_for(s) or "UNKNOWN"
-        key = f"{mode}|{dn}"
-
-        cur_score = s.get("score") or 0
-        prev = best_by_player.get(key)
-        if not prev or (cur_score > (prev.get("score") or 0)):
-            best_by_player[key] = {
-                "mode": mode,
-                "dancerName": dn,
-                "score": cur_score,
-                "clearKind": s.get("clearKind"),
-                "rank": s.get("rank"),
-                "difficulty": s.get("difficulty"),
+    Rankings de varias canciones en un solo request (dashboards).
+    Cada canción trae su TOP N por modo (o por dificultad si se pasan
+    `difficulties`); la songMeta va una sola vez por canción en `songMeta`.
+    Todo sale del mismo snapshot, así los boards son consistentes entre sí.
+    """
+    ids: List[str] = []
+    for raw in songIds:
+        ids.extend(x.strip() for x in raw.split(",") if x.strip())
+    ids = list(dict.fromkeys(ids))[:MAX_BATCH_SONGS]
+
+    snap = cache.snapshot()
+    view = snap.hiscores if source == "hiscore3" else snap.scores
+    boards = snap.hiscore_boards if source == "hiscore3" else snap.score_boards
+    want_modes = set(modes.split(","))
+    diffs = [int(d) for d in dict.fromkeys(difficulties.split(","))] if difficulties else [ANY_DIFFICULTY]
+
+    rankings: List[Dict[str, Any]] = []
+    song_meta: Dict[str, Any] = {}
+    for songId in ids:
+        try:
+            sid = int(songId)
+        except Exception:
+            sid = NONE
+        song_meta[songId] = _ranking_meta(snap, songId)
+        for diff in diffs:
+            item: Dict[str, Any] = {
+                "songId": songId,
+                "difficulty": None if diff == ANY_DIFFICULTY else diff,
             }
+            if "S" in want_modes:
+                item["single"] = _board_rows(view, boards.get((sid, 0, diff)), "S", limit)
+            if "D" in want_modes:
+                item["double"] = _board_rows(view, boards.get((sid, 1, diff)), "D", limit)
+            rankings.append(item)
 
-    # separa y ordena
-    single = [v for k, v in best_by_player.items() if k.startswith("S|")]
-    double = [v for k, v in best_by_player.items() if k.startswith("D|")]
-    single.sort(key=lambda r: r.get("score") or 0, reverse=True)
-    double.sort(key=lambda r: r.get("score") or 0, reverse=True)
+    return json_response({
+        "source": source,
+        "songMeta": song_meta,
+        "rankings": rankings,
+    })
 
-    single = single[:limit]
-    double = double[:limit]
 
-    meta = cache.song_meta(songId) or {}
-    song_meta = {
+def _ranking_meta(snap: Snapshot, songId: Union[int, str]) -> Dict[str, Any]:
+    meta = snap.song_meta(songId) or {}
+    return {
         "title": meta.get("title") or meta.get("name"),
         "basename": meta.get("basename"),
         "series": meta.get("series"),
@@ -128,9 +306,19 @@ def song_ranking(
         "diffLv": meta.get("diffLv"),
     }
 
-    return {
-        "songId": songId,
-        "songMeta": song_meta,
-        "single": single,
-        "double": double,
-    }
+
+def _board_rows(view: ScoreView, board: Optional[Board], mode: str, limit: int) -> List[Dict[str, Any]]:
+    """Filas del TOP de un board (mejor score de cada jugador)."""
+    if board is None:
+        return []
+    out: List[Dict[str, Any]] = []
+    for _, i in board.top(limit):
+        out.append({
+            "mode": mode,
+            "dancerName": view.dancer_name(i) or "UNKNOWN",
+            "score": view.value("score", i) or 0,
+            "clearKind": view.value("clear_kind", i),
+            "rank": view.value("rank", i),
+            "difficulty": view.value("difficulty", i),
+        })
+    return out
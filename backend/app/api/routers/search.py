@@ -0,0 +1,29 @@
+# app/api/routers/search.py
+from __future__ import annotations
+from fastapi import APIRouter, Query
+from typing import Any, Dict, Optional
+from app.services.cache import cache
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("")
+def autocomplete(
+    q: str = Query(..., min_length=1),
+    kind: Optional[str] = Query(None, pattern="^(song|dancer)$"),
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+) -> Dict[str, Any]:
+    """
+    Autocompletado de canciones y bailarines desde el mismo índice.
+    Cada item: {kind, id, label, score}; las canciones traen basename/series.
+    """
+    results = cache.snapshot().search.search(q, kind=kind)
+    items = []
+    for e, score in results[offset:offset + limit]:
+        item: Dict[str, Any] = {"kind": e.kind, "id": e.id, "label": e.label, "score": score}
+        if e.data:
+            item["basename"] = e.data.get("basename")
+            item["series"] = e.data.get("series")
+        items.append(item)
+    return {"total": len(results), "items": items}
@@ -1,20 +1,26 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Response
 from typing import Dict, Any, List, Optional
 from app.services.cache import cache
 
 router = APIRouter(prefix="/songs", tags=["songs"])
 
 @router.get("", response_model=List[Dict[str, Any]])
-def list_songs(q: Optional[str] = Query(None)):
-    cache.load_if_changed()
-    items = []
-    for k, v in cache.songs_dict.items():
-        name = (v.get("name") or v.get("title") or k)
-        artist = v.get("artist", "")
-        if q:
-            ql = q.lower()
-            if ql not in str(name).lower() and ql not in str(artist).lower():
-                continue
-        items.append({"id": k, **v})
-    items.sort(key=lambda x: str(x.get("name", "")))
-    return items
+def list_songs(
+    response: Response,
+    q: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=5000),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Catálogo de canciones. Con `q` busca por título/artista/basename
+    (prefijo + difuso, sin acentos ni mayúsculas) y ordena por relevancia;
+    sin `q` ordena por nombre. El total va en X-Total-Count.
+    """
+    index = cache.snapshot().search
+    if q and q.strip():
+        entries = [e for e, _ in index.search(q, kind="song")]
+    else:
+        entries = index.songs_sorted
+
+    response.headers["X-Total-Count"] = str(len(entries))
+    return [{"id": e.id, **e.data} for e in entries[offset:offset + limit]]
@@ -1,54 +1,38 @@
 # app/api/routers/stats.py
 from __future__ import annotations
-from fastapi import APIRouter
-from typing import Any, Dict, List
+from fastapi import APIRouter, HTTPException, Query
+from typing import Any, Dict, List, Optional
+from app.services.activity import BUCKETS
 from app.services.cache import cache
+from app.services.dancer_stats import FIELDS
+from app.services.ghosts import ghost_store
+from app.services.score_store import NONE
+from app.services.level_matrix import level_matrix
+from app.services.live import live_hub
+from app.services.response_cache import response_cache
+from app.services.watcher import watcher
+from app.services.write_queue import write_queue
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
-# Índices de clearKind relevantes
-CK_FC, CK_GFC, CK_PFC, CK_MFC = 7, 8, 9, 10
-RANK_AAA_IDX = 0  # "AAA" en tu array de ranks
-
-
 @router.get("/dancers")
-def dancers_summary() -> Dict[str, Any]:
+def dancers_summary(
+    source: str = Query("score3", pattern="^(score3|hiscore3)$"),
+) -> Dict[str, Any]:
     """
-    Agrega por jugador: total, AAA por rank, y FC/GFC/PFC/MFC por clearKind.
-    Usa score3 (juegos registrados), pero puedes cambiar a hiscore3 si quieres.
+    Agrega por jugador: total de registros, charts jugados y, sobre el mejor
+    score de cada chart, AAA por rank y FC/GFC/PFC/MFC por clearKind.
+    Los contadores se mantienen al ingerir (ver DancerStats): esto es O(dancers).
     """
-    cache.load_if_changed()
-    agg: Dict[str, Dict[str, int]] = {}
-
-    for s in cache.scores:  # usar cache.hiscores si prefieres hiscore3
-        name = cache.dancer_name_for(s) or "UNKNOWN"
-
-        a = agg.get(name)
-        if not a:
-            a = {"total": 0, "AAA": 0, "FC": 0, "GFC": 0, "PFC": 0, "MFC": 0}
-            agg[name] = a
-
-        a["total"] += 1
-
-        # rank
-        r = s.get("rank")
-        if isinstance(r, int) and r == RANK_AAA_IDX:
-            a["AAA"] += 1
-
-        # clearKind
-        ck = s.get("clearKind")
-        if ck == CK_FC:
-            a["FC"] += 1
-        elif ck == CK_GFC:
-            a["GFC"] += 1
-        elif ck == CK_PFC:
-            a["PFC"] += 1
-        elif ck == CK_MFC:
-            a["MFC"] += 1
+    snap = cache.snapshot()
+    view = snap.hiscores if source == "hiscore3" else snap.scores
+    counters = snap.hiscore_stats if source == "hiscore3" else snap.score_stats
+    names = view.strings.values
 
     # Serializa a lista ordenada (AAA desc, luego total desc)
     rows: List[Dict[str, Any]] = [
-        {"dancerName": name, **vals} for name, vals in agg.items()
+        {"dancerName": names[did] if did != NONE else "UNKNOWN", **dict(zip(FIELDS, vals))}
+        for did, vals in counters.items()
     ]
     rows.sort(key=lambda x: (x["AAA"], x["total"]), reverse=True)
 
@@ -56,3 +40,95 @@ def dancers_summary() -> Dict[str, Any]:
         "total_dancers": len(rows),
         "rows": rows,
     }
+
+
+@router.get("/levels")
+def level_progress(
+    dancer: Optional[str] = None,
+    source: str = Query("score3", pattern="^(score3|hiscore3)$"),
+    style: Optional[str] = Query(None, pattern="^[SD]$"),
+) -> Dict[str, Any]:
+    """
+    Progreso por nivel (1..19): charts del catálogo, jugados, lámparas
+    (al menos MFC/PFC/GFC/FC), notas por umbral de score y porcentajes.
+    Con `dancer` devuelve solo ese jugador; sin él, todos.
+    Se calcula una vez por versión de datos (ver LevelMatrix).
+    """
+    snap = cache.snapshot()
+    matrix = level_matrix(snap, source)
+    st = None if style is None else (1 if style == "D" else 0)
+    names = matrix.view.strings
+
+    if dancer:
+        did = names.lookup(dancer)
+        if did == NONE or did not in matrix.by_dancer:
+            raise HTTPException(status_code=404, detail="Dancer sin scores")
+        return {"dancerName": dancer, "source": source, "style": style, "levels": matrix.dancer(did, st)}
+
+    rows = [
+        {"dancerName": names.values[did] if did != NONE else "UNKNOWN", "levels": matrix.dancer(did, st)}
+        for did in matrix.by_dancer
+    ]
+    rows.sort(key=lambda r: r["dancerName"])
+    return {"source": source, "style": style, "rows": rows}
+
+
+@router.get("/activity")
+def activity(
+    bucket: str = Query("day", pattern="^(hour|day|week)$"),
+    start: Optional[int] = Query(None, description="ms epoch (incluido)"),
+    end: Optional[int] = Query(None, description="ms epoch (excluido)"),
+    dancer: Optional[str] = None,
+    songId: Optional[int] = None,
+    source: str = Query("score3", pattern="^(score3|hiscore3)$"),
+) -> Dict[str, Any]:
+    """
+    Plays por bucket (hora/día/semana, UTC) en [start, end): global, de un
+    dancer o de una canción. El rango se acota a lo registrado (sin rango,
+    todo). Total y serie salen de bisect sobre los buckets congelados del
+    snapshot (ver Buckets), no de recorrer registros ni el rango pedido.
+    """
+    if dancer and songId is not None:
+        raise HTTPException(status_code=400, detail="Usar dancer o songId, no ambos")
+    snap = cache.snapshot()
+    view = snap.hiscores if source == "hiscore3" else snap.scores
+    index = snap.hiscore_activity if source == "hiscore3" else snap.score_activity
+
+    if dancer == "UNKNOWN":
+        scope = index.by_dancer.get(NONE)
+    elif dancer:
+        did = view.strings.lookup(dancer)
+        scope = index.by_dancer.get(did) if did != NONE else None   # nombre desconocido: vacío
+    elif songId is not None:
+        scope = index.by_song.get(songId)
+    else:
+        scope = index.overall
+
+    if scope is None:
+        return {"bucket": bucket, "start": start, "end": end, "total": 0, "series": []}
+
+    lo = scope.first if start is None else max(start, scope.first)
+    hi = scope.last + 1 if end is None else min(end, scope.last + 1)
+    if lo >= hi:
+        return {"bucket": bucket, "start": start, "end": end, "total": 0, "series": []}
+    size = BUCKETS[bucket]
+    return {
+        "bucket": bucket,
+        "start": lo,
+        "end": hi,
+        "total": scope.total(lo, hi),
+        "series": [{"start": b, "count": n} for b, n in scope.series(size, lo, hi)],
+    }
+
+
+@router.get("/cache")
+def cache_status() -> Dict[str, Any]:
+    """Métricas del cache: recargas, staleness del watcher y hits/misses de respuestas."""
+    return {
+        **cache.stats(),
+        "watcher": watcher.stats(),
+        "responses": response_cache.stats(),
+        "live": live_hub.stats(),
+        "ghosts": {"indexed": len(cache.snapshot().ghosts), **ghost_store.stats()},
+        "writes": write_queue.stats(),
+    }
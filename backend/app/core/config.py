@@ -6,6 +6,34 @@ class Settings(BaseSettings):
     NDJSON_PATH: str = "C:/asphyxia/savedata/ddr@mdx.db"
     SONGS_DICT_PATH: str = "C:/Users/Pochogeims/Downloads/piu-ddr-scoreboardbkp/piu-ddr-scoreboard/songs.json"
 
+    # Watcher de archivos (recarga del cache fuera de los requests)
+    WATCH_INTERVAL_SEC: float = 0.5   # cada cuánto se revisan los archivos
+    WATCH_DEBOUNCE_SEC: float = 0.3   # espera a que paren las escrituras
+    WATCH_MAX_DELAY_SEC: float = 2.0  # tope de espera con escrituras continuas
+
+    # Carga en frío en paralelo del NDJSON (0/1 = secuencial)
+    INGEST_WORKERS: int = 0
+    INGEST_CHUNK_BYTES: int = 8 * 1024 * 1024   # tamaño aprox. de cada tramo
+
+    # Sidecar con los índices persistidos (arranque sin reparsear todo)
+    INDEX_SIDECAR: bool = True
+    INDEX_SIDECAR_PATH: str = ""   # vacío = NDJSON_PATH + ".idx"
+
+    # Cache HTTP (ETag por versión de datos + Cache-Control)
+    HTTP_ETAGS: bool = True
+    SONGS_MAX_AGE_SEC: int = 86400   # /songs casi no cambia: cache larga en el navegador
+    RESPONSE_CACHE: bool = True      # respuestas ya serializadas/comprimidas por versión
+    RESPONSE_CACHE_MB: int = 64      # tope de memoria del cache de respuestas
+
+    # Escrituras al NDJSON (profile3/customize3): fsync tras cada bloque agregado
+    NDJSON_FSYNC: bool = False
+    WRITE_BATCH_MAX_BYTES: int = 1024 * 1024   # tope de una tanda del escritor (group commit)
+    NDJSON_LOCK_TIMEOUT_SEC: float = 5.0   # espera máx. del lock (NDJSON_PATH + ".lock"); después 503
+    NDJSON_TAIL_WAIT_SEC: float = 1.0      # espera máx. a que el juego termine su línea; después 503
+
+    # Ghosts (ghost3): se decodifican bajo demanda, con LRU de los últimos usados
+    GHOST_CACHE_SIZE: int = 512
+
     # CORS (frontend)
     CORS_ORIGINS: list[str] = ["http://localhost:5173", "http://127.0.0.1:5173"]
 
@@ -0,0 +1,161 @@
+# app/core/http_cache.py
+from __future__ import annotations
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.services.cache import cache
+from app.services.response_cache import CachedResponse, pick_encoding, response_cache
+
+# Endpoints de lectura con ETag y cache de respuestas: (prefijo, versión de la que dependen)
+# "songs" = solo songs.json; "data" = cualquier cambio del snapshot
+CACHEABLE: Tuple[Tuple[str, str], ...] = (
+    ("/songs", "songs"),
+    ("/scores", "data"),
+    ("/stats/dancers", "data"),
+    ("/stats/levels", "data"),
+    ("/stats/activity", "data"),
+    ("/search", "data"),
+    ("/ghosts", "data"),
+    ("/events", "data"),
+    ("/leagues", "data"),
+)
+
+# (ruta, parámetro booleano): con el parámetro activo la respuesta lleva ETag
+# pero no se guarda en el cache de respuestas (cuerpos enormes que desplazarían al resto)
+UNSTORED: Tuple[Tuple[str, str], ...] = (
+    ("/scores/unified", "raw"),
+)
+
+# Los datos cambian cuando escribe la máquina: el navegador guarda la
+# respuesta pero revalida siempre (un 304 no cuesta nada)
+DATA_CACHE_CONTROL = "no-cache"
+
+
+def _kind(path: str) -> Optional[str]:
+    for prefix, kind in CACHEABLE:
+        if path == prefix or path.startswith(prefix + "/"):
+            return kind
+    return None
+
+
+def _storable(request: Request) -> bool:
+    for path, param in UNSTORED:
+        # mismos valores verdaderos que acepta FastAPI para un bool
+        if request.url.path == path and request.query_params.get(param, "").lower() in ("1", "true", "on", "yes"):
+            return False
+    return True
+
+
+def _normalized_query(request: Request) -> str:
+    return "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+
+
+def make_etag(request: Request, kind: str, version: int, query: str) -> str:
+    """
+    ETag débil: proceso + versión de los datos + ruta + query normalizada.
+    Débil porque el mismo tag cubre el cuerpo sin comprimir, gzip y br (no
+    son idénticos byte a byte); un cache compartido no debe mezclarlos.
+    """
+    raw = f"{cache.boot_id}:{kind}:{version}:{request.url.path}?{query}"
+    return 'W/"' + hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match usa comparación débil: se ignora el prefijo W/."""
+    if not header:
+        return False
+    etag = etag.removeprefix("W/")
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def cache_control(kind: str) -> str:
+    if kind == "songs":
+        return f"public, max-age={settings.SONGS_MAX_AGE_SEC}"
+    return DATA_CACHE_CONTROL
+
+
+# Headers que arma el middleware (no se guardan con la respuesta cacheada)
+_OWN_HEADERS = {"content-length", "content-type", "content-encoding", "etag", "cache-control", "vary"}
+
+
+def json_response(payload: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    JSON ya serializado (mismo formato que JSONResponse) sin pasar por la
+    validación/jsonable_encoder de FastAPI: para payloads grandes de tipos simples.
+    """
+    body = json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _cached(
+    key: Tuple[str, str, str, int], entry: CachedResponse, request: Request, headers: Dict[str, str]
+) -> Response:
+    encoding = pick_encoding(request.headers.get("accept-encoding", ""))
+    # la primera compresión de una variante es CPU: fuera del event loop
+    body, used = await run_in_threadpool(response_cache.body_for, key, entry, encoding)
+    out = {**entry.headers, **headers, "Vary": "Accept-Encoding"}
+    if used:
+        out["Content-Encoding"] = used
+    return Response(content=body, media_type=entry.media_type, headers=out)
+
+
+async def etag_middleware(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """
+    GET de lectura:
+    - If-None-Match coincide con el ETag de la versión actual -> 304 sin
+      ejecutar el handler.
+    - La misma (ruta, query, versión) ya se sirvió -> bytes guardados en el
+      cache de respuestas (gzip/br según Accept-Encoding), sin handler ni JSON.
+    - Si no, se ejecuta el handler y su cuerpo 200 queda guardado.
+    """
+    kind = _kind(request.url.path) if request.method in ("GET", "HEAD") else None
+    if kind is None or not (settings.HTTP_ETAGS or settings.RESPONSE_CACHE):
+        return await call_next(request)
+
+    # versión/ETag se calculan ANTES del handler: si los datos cambian en medio,
+    # la respuesta es más nueva que su clave y el próximo request no coincide
+    snap = cache.snapshot()
+    version = snap.songs_version if kind == "songs" else snap.version
+    query = _normalized_query(request)
+    headers: Dict[str, str] = {}
+    if settings.HTTP_ETAGS:
+        etag = make_etag(request, kind, version, query)
+        headers = {"ETag": etag, "Cache-Control": cache_control(kind)}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+    if not (settings.RESPONSE_CACHE and _storable(request)):
+        response = await call_next(request)
+        if response.status_code == 200:
+            response.headers.update(headers)
+        return response
+
+    key = (kind, request.url.path, query, version)
+    entry = response_cache.get(key)
+    if entry is not None:
+        return await _cached(key, entry, request, headers)
+
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+    if not response.headers.get("content-type", "").startswith("application/json"):
+        # exports en streaming (NDJSON/CSV): pasan directo, no se guardan
+        response.headers.update(headers)
+        return response
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    entry = CachedResponse(
+        body,
+        {k: v for k, v in response.headers.items() if k.lower() not in _OWN_HEADERS},
+        "application/json",
+    )
+    response_cache.put(key, kind, version, entry)
+    return await _cached(key, entry, request, headers)
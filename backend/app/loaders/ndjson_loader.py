@@ -1,5 +1,8 @@
 import json
-from typing import Iterable, Dict, Any
+from typing import Collection, Iterable, Iterator, Dict, Any, Optional, Tuple
+
+# En el formato de asphyxia "collection" siempre es la primera clave
+_COLLECTION_PREFIX = b'{"collection":"'
 
 def iter_ndjson(path: str) -> Iterable[Dict[str, Any]]:
     with open(path, "r", encoding="utf-8") as f:
@@ -9,6 +12,48 @@ def iter_ndjson(path: str) -> Iterable[Dict[str, Any]]:
                 continue
             yield json.loads(line)
 
+def line_collection(line: bytes) -> Optional[bytes]:
+    """
+    Lee la colección desde el prefijo de la línea sin decodificar el JSON.
+    Devuelve None si la línea no calza el formato rápido (hay que parsearla).
+    """
+    if line.startswith(_COLLECTION_PREFIX):
+        start = len(_COLLECTION_PREFIX)
+        end = line.find(b'"', start)
+        if end != -1:
+            return line[start:end]
+    return None
+
+def iter_collections(lines: Iterable[bytes], wanted: Collection[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Decodifica solo las líneas de las colecciones pedidas.
+    Las que no calzan el prefijo rápido se parsean completas y se filtran igual.
+    """
+    for obj, _ in iter_located(((line, 0) for line in lines), wanted):
+        yield obj
+
+def iter_located(
+    lines: Iterable[Tuple[bytes, int]], wanted: Collection[str]
+) -> Iterator[Tuple[Dict[str, Any], Tuple[int, int]]]:
+    """
+    Como iter_collections pero con líneas (bytes, offset en el archivo):
+    devuelve cada objeto con (offset, largo) de su línea, para releerla después.
+    """
+    wanted_b = {w.encode() for w in wanted}
+    for raw, pos in lines:
+        line = raw.strip()
+        if not line:
+            continue
+        col = line_collection(line)
+        if col is not None and col not in wanted_b:
+            continue
+        try:
+            obj = json.loads(line)
+        except Exception:
+            continue
+        if isinstance(obj, dict) and obj.get("collection") in wanted:
+            yield obj, (pos, len(raw))
+
 def normalize_date(d):
     if isinstance(d, dict) and "$$date" in d:
         import datetime as dt
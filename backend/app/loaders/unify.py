@@ -1,4 +1,5 @@
-from typing import Any, Dict, Iterable, List, Optional
+import json
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 from .ndjson_loader import normalize_date
 
 def map_style_label(style: Optional[int]) -> Optional[str]:
@@ -18,49 +19,125 @@ def _norm_name(x: Optional[str]) -> Optional[str]:
     n = str(x).strip()
     return n if n else None
 
-def unify_records(raw_docs: Iterable[Dict[str, Any]], songs_dict: Dict[str, Any]) -> List[Dict[str, Any]]:
+def _song_meta(meta: Dict[str, Any], key: Optional[str]) -> Dict[str, Any]:
+    image_basename = (
+        meta.get("imageBasename")
+        or meta.get("image_basename")
+        or meta.get("basename")
+        or meta.get("image")
+        or meta.get("cover")
+        or None
+    )
+    return {
+        "name": meta.get("name") or meta.get("title") or key,
+        "artist": meta.get("artist", ""),
+        "series": meta.get("series", ""),
+        "bpm": meta.get("bpm"),
+        "imageUrl": meta.get("imageUrl") or meta.get("image_url"),
+        "imageBasename": image_basename,
+        "levelInfo": meta.get("levelInfo") or meta.get("diffLv"),
+    }
+
+def unify_records(
+    raw_docs: Iterable[Dict[str, Any]],
+    songs_dict: Dict[str, Any],
+    keep_raw: bool = False,
+) -> List[Dict[str, Any]]:
     """
     Unifica documentos tomando **solo score3**, dedup fuerte y
     RELLENA dancerName desde profile3 por __refid/pcbid si falta.
-    """
-    raw_docs = list(raw_docs)  # lo toco más de una vez
 
-    # --- 1) Index de perfiles para fallback de nombres ---
-    by_refid: Dict[str, str] = {}
-    by_pcbid: Dict[str, str] = {}
+    Una sola pasada sobre raw_docs (puede ser el generador de iter_ndjson)
+    con un Unifier: la memoria depende de los charts únicos por jugador,
+    no del tamaño del archivo.
+    Con keep_raw=True cada registro conserva el documento original en "raw".
+    """
+    unifier = Unifier(keep_raw=keep_raw)
     for doc in raw_docs:
-        if doc.get("collection") in ("profile3", "profile"):
+        unifier.add(doc)
+    return unifier.rows(songs_dict)
+
+
+# Línea de un score3 en el NDJSON: (offset, largo, _id) para releer el original
+RawRef = Tuple[int, int, Any]
+# Mejor score3 de una clave y un score: (rango, registro sin songMeta/grade, línea o None)
+Best = Tuple[Tuple, Dict[str, Any], Optional[RawRef]]
+
+
+class Unifier:
+    """
+    Estado incremental de unify_records, alimentado en orden de archivo:
+
+    - by_refid / by_pcbid: primer dancerName de profile3 (nombres de fallback).
+    - best: por (songId, mode, difficulty, dancer) -o (songId, mode, dancer)
+      si no trae dificultad- el mejor score3 de cada score distinto, con su
+      rango (score, createdAt, -orden) para desempatar igual que el sort
+      estable original. No alcanza con el mejor por clave: si la regla de
+      score repetido (songId, dancer, score) descarta al mejor, el chart sale
+      con su siguiente score distinto, como en la versión original.
+
+    add() cuesta O(1) por documento; rows() resuelve los nombres pendientes
+    (el profile3 puede venir después del score), ordena y deduplica sin
+    modificar el estado. El cache lo mantiene al ingerir y publica frozen();
+    el dict de scores de una clave se copia la primera vez que cambia
+    después de cada frozen(), así las copias publicadas no ven lo nuevo.
+    """
+
+    def __init__(self, keep_raw: bool = False) -> None:
+        self.keep_raw = keep_raw
+        self.by_refid: Dict[str, str] = {}
+        self.by_pcbid: Dict[str, str] = {}
+        # clave -> score -> mejor score3 con ese score
+        self.best: Dict[Tuple, Dict[Any, Best]] = {}
+        self.seq = 0   # score3 vistos (orden de archivo)
+        self._frozen: Optional[Unifier] = None            # última copia publicada
+        self._owned: Set[Tuple] = set()   # claves cuyo dict ya no comparte la copia publicada
+        self._memo: Optional[Tuple[Any, List[Dict[str, Any]]]] = None   # (clave de songs, rows)
+
+    def add(self, doc: Dict[str, Any], at: Optional[Tuple[int, int]] = None) -> None:
+        """Procesa un documento; `at` = (offset, largo) de su línea, para servir raw después."""
+        col = doc.get("collection")
+        if col in ("profile3", "profile"):
             refid = _norm_name(doc.get("__refid"))
             pcbid = _norm_name(doc.get("pcbid"))
             pname = _norm_name(doc.get("dancerName")) or _norm_name(doc.get("player")) or _norm_name(doc.get("name"))
             if pname:
-                if refid and refid not in by_refid:
-                    by_refid[refid] = pname
-                if pcbid and pcbid not in by_pcbid:
-                    by_pcbid[pcbid] = pname
-
-    # --- 2) Unificar solo score3 ---
-    scores: List[Dict[str, Any]] = []
-    for doc in raw_docs:
-        if doc.get("collection") != "score3":
-            continue
+                if refid and refid not in self.by_refid:
+                    self.by_refid[refid] = pname
+                    self._frozen = None
+                if pcbid and pcbid not in self.by_pcbid:
+                    self.by_pcbid[pcbid] = pname
+                    self._frozen = None
+            return
+        if col != "score3":
+            return
 
+        seq = self.seq
+        self.seq += 1
         song_id = doc.get("songId")
         style = _to_int_or_none(doc.get("style"))
+        mode = map_style_label(style)
         difficulty = _to_int_or_none(doc.get("difficulty"))
 
-        # Nombre del jugador con fallbacks
-        dancer = _norm_name(doc.get("dancerName")) or _norm_name(doc.get("player"))
+        # Nombre del jugador; si falta, queda pendiente por (__refid, pcbid)
+        dancer: Any = _norm_name(doc.get("dancerName")) or _norm_name(doc.get("player"))
         if not dancer:
-            refid = _norm_name(doc.get("__refid"))
-            pcbid = _norm_name(doc.get("pcbid"))
-            dancer = (by_refid.get(refid) if refid else None) or (by_pcbid.get(pcbid) if pcbid else None) or "UNKNOWN"
+            dancer = (_norm_name(doc.get("__refid")), _norm_name(doc.get("pcbid")))
+
+        key = (song_id, mode, difficulty, dancer) if difficulty is not None else (song_id, mode, dancer)
+        score = doc.get("score")
+        scores = self.best.get(key)
+        cur = scores.get(score) if scores is not None else None
+        created = normalize_date(doc.get("createdAt"))
+        rank = (score or 0, created or "", -seq)
+        if cur is not None and cur[0] >= rank:
+            return
 
         base = {
             "source": "score3",
             "songId": song_id,
             "style": style,
-            "mode": map_style_label(style),   # "S" | "D"
+            "mode": mode,                     # "S" | "D"
             "difficulty": difficulty,         # 0..4
             "dancerName": dancer,
             "score": doc.get("score"),
@@ -70,73 +147,169 @@ def unify_records(raw_docs: Iterable[Dict[str, Any]], songs_dict: Dict[str, Any]
             "maxCombo": doc.get("maxCombo"),
             "country": doc.get("country"),
             "region": doc.get("region"),
-            "createdAt": normalize_date(doc.get("createdAt")),
+            "createdAt": created,
             "updatedAt": normalize_date(doc.get("updatedAt")),
-            "raw": doc,
         }
+        if self.keep_raw:
+            base["raw"] = doc
+        ref = (at[0], at[1], doc.get("_id")) if at is not None else None
+        self._scores(key)[score] = (rank, base, ref)
 
-        key = str(song_id) if song_id is not None else None
-        meta = songs_dict.get(key, {})
-
-        image_basename = (
-            meta.get("imageBasename")
-            or meta.get("image_basename")
-            or meta.get("basename")
-            or meta.get("image")
-            or meta.get("cover")
-            or None
-        )
-
-        base["songMeta"] = {
-            "name": meta.get("name") or meta.get("title") or key,
-            "artist": meta.get("artist", ""),
-            "series": meta.get("series", ""),
-            "bpm": meta.get("bpm"),
-            "imageUrl": meta.get("imageUrl") or meta.get("image_url"),
-            "imageBasename": image_basename,
-            "levelInfo": meta.get("levelInfo") or meta.get("diffLv"),
-        }
+    def _scores(self, key: Tuple) -> Dict[Any, Best]:
+        """Dict de scores de key, propio (no compartido con la copia publicada)."""
+        self._frozen = None
+        scores = self.best.get(key)
+        if key not in self._owned:
+            scores = self.best[key] = dict(scores) if scores is not None else {}
+            self._owned.add(key)
+        return scores
 
-        base["grade"] = infer_grade(base)
-        scores.append(base)
+    def merge(self, other: "Unifier") -> None:
+        """Agrega el estado de un tramo posterior del archivo (mismo resultado que secuencial)."""
+        for refid, name in other.by_refid.items():
+            self.by_refid.setdefault(refid, name)
+        for pcbid, name in other.by_pcbid.items():
+            self.by_pcbid.setdefault(pcbid, name)
+        shift = self.seq
+        for key, theirs in other.best.items():
+            scores = self._scores(key)
+            for score, (rank, base, ref) in theirs.items():
+                rank = (rank[0], rank[1], rank[2] - shift)
+                cur = scores.get(score)
+                if cur is None or rank > cur[0]:
+                    scores[score] = (rank, base, ref)
+        self.seq += other.seq
+        self._frozen = None
 
-    # --- 3) Orden y dedup ---
-    def sort_key(x):
-        return (x.get("score") or 0, x.get("createdAt") or "")
-    scores.sort(key=sort_key, reverse=True)
+    def frozen(self) -> "Unifier":
+        """Copia para el snapshot: se rehace solo si algo cambió desde la anterior."""
+        if self._frozen is None:
+            copy = Unifier(self.keep_raw)
+            copy.by_refid, copy.by_pcbid, copy.best = dict(self.by_refid), dict(self.by_pcbid), dict(self.best)
+            copy.seq = self.seq
+            copy._frozen = copy
+            self._frozen = copy
+            self._owned = set()
+        return self._frozen
 
-    dedup: List[Dict[str, Any]] = []
-    seen_primary = set()
-    seen_fallback = set()
-    seen_same_score = set()
+    def cached_rows(self, songs_dict: Dict[Any, Any], songs_key: Any) -> List[Dict[str, Any]]:
+        """rows() calculado una vez por copia publicada y versión de songs.json."""
+        memo = self._memo
+        if memo is None or memo[0] != songs_key:
+            memo = self._memo = (songs_key, self.rows(songs_dict))
+        return memo[1]
 
-    for s in scores:
-        song_id = s.get("songId")
-        mode = s.get("mode")
-        diff = s.get("difficulty")
-        dancer = s.get("dancerName")
-        sc = s.get("score")
+    def rows(self, songs_dict: Dict[Any, Any], raw_path: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Lista final ordenada por (score, createdAt desc; empates en orden de
+        archivo) y sin scores repetidos por canción y dancer. Los registros
+        son copias nuevas. Con raw_path se agrega "raw" releyendo cada línea.
+        """
+        # --- Resolver nombres pendientes (puede juntar claves) ---
+        resolved: Dict[Tuple, Tuple[Tuple, Dict[str, Any], Optional[RawRef], Any, Tuple]] = {}
+        for key, scores in self.best.items():
+            for score, (rank, base, ref) in scores.items():
+                dancer = base["dancerName"]
+                rkey = key
+                if isinstance(dancer, tuple):
+                    refid, pcbid = dancer
+                    dancer = (self.by_refid.get(refid) if refid else None) or (self.by_pcbid.get(pcbid) if pcbid else None) or "UNKNOWN"
+                    rkey = key[:-1] + (dancer,)
+                cur = resolved.get((rkey, score))
+                if cur is None or rank > cur[0]:
+                    resolved[(rkey, score)] = (rank, base, ref, dancer, rkey)
 
-        key_primary = (song_id, mode, diff, dancer) if diff is not None else None
-        key_fallback = (song_id, mode, dancer)
-        key_same_score = (song_id, dancer, sc)
+        # --- Orden y dedup: un registro por clave y sin scores repetidos por canción y dancer ---
+        ordered = sorted(resolved.values(), key=lambda x: x[0], reverse=True)
+        picked = []
+        seen_key = set()
+        seen_same_score = set()
+        for rank, base, ref, dancer, rkey in ordered:
+            key_same_score = (base["songId"], dancer, base["score"])
+            if rkey in seen_key or key_same_score in seen_same_score:
+                continue
+            seen_key.add(rkey)
+            seen_same_score.add(key_same_score)
+            picked.append((base, ref, dancer))
 
-        if key_primary and key_primary in seen_primary:
-            continue
-        if (key_primary is None) and (key_fallback in seen_fallback):
-            continue
-        if key_same_score in seen_same_score:
-            continue
+        raws = _read_raw(raw_path, [ref for _, ref, _ in picked]) if raw_path else None
+        metas: Dict[Optional[str], Dict[str, Any]] = {}   # songMeta compartido por canción
+        dedup: List[Dict[str, Any]] = []
+        for base, ref, dancer in picked:
 
-        if key_primary:
-            seen_primary.add(key_primary)
-        else:
-            seen_fallback.add(key_fallback)
-        seen_same_score.add(key_same_score)
+            s = dict(base)
+            s["dancerName"] = dancer
+            if raws is not None:
+                s["raw"] = raws.get(ref)
+            song_id = s["songId"]
+            mkey = str(song_id) if song_id is not None else None
+            meta = metas.get(mkey)
+            if meta is None:
+                meta = metas[mkey] = _song_meta(songs_dict.get(mkey, {}), mkey)
+            s["songMeta"] = meta
+            s["grade"] = infer_grade(s)
+            dedup.append(s)
+        return dedup
 
-        dedup.append(s)
+    # las copias y el memo no se persisten (sidecar, workers de la carga en paralelo)
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"keep_raw": self.keep_raw, "by_refid": self.by_refid, "by_pcbid": self.by_pcbid,
+                "best": self.best, "seq": self.seq}
 
-    return dedup
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._frozen = None
+        self._memo = None
+        self._owned = set()
 
-def infer_grade(score_row: Dict[str, Any]) -> Optional[str]:
+
+def _read_raw(path: str, refs: Iterable[Optional[RawRef]]) -> Dict[RawRef, Any]:
+    """
+    Documento original de cada línea referenciada. Si el archivo se
+    reescribió y la línea ya no es ese score3 (otro _id) queda sin raw.
+    """
+    out: Dict[RawRef, Any] = {}
+    try:
+        with open(path, "rb") as f:
+            for ref in sorted((r for r in refs if r is not None), key=lambda r: r[0]):
+                f.seek(ref[0])
+                try:
+                    doc = json.loads(f.read(ref[1]))
+                except ValueError:
+                    continue
+                if isinstance(doc, dict) and doc.get("_id") == ref[2]:
+                    out[ref] = doc
+    except OSError:
+        pass
+    return out
+
+# Umbrales de nota DDR (score mínimo, letra), de mayor a menor
+GRADE_THRESHOLDS = (
+    (990000, "AAA"),
+    (950000, "AA+"),
+    (900000, "AA"),
+    (890000, "AA-"),
+    (850000, "A+"),
+    (800000, "A"),
+    (790000, "A-"),
+    (750000, "B+"),
+    (700000, "B"),
+    (690000, "B-"),
+    (650000, "C+"),
+    (600000, "C"),
+    (590000, "C-"),
+    (550000, "D+"),
+    (0, "D"),
+)
+GRADES = tuple(g for _, g in GRADE_THRESHOLDS)
+
+def grade_for_score(score: Optional[int]) -> Optional[str]:
+    if score is None or score < 0:
+        return None
+    for minimum, grade in GRADE_THRESHOLDS:
+        if score >= minimum:
+            return grade
     return None
+
+def infer_grade(score_row: Dict[str, Any]) -> Optional[str]:
+    return grade_for_score(_to_int_or_none(score_row.get("score")))
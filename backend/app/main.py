@@ -1,18 +1,28 @@
 # app/main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.api.routers import scores, songs, stats, auth, me, customize  # ← incluye customize
+from app.core.http_cache import etag_middleware
+from app.api.routers import scores, songs, stats, auth, me, customize, search, live, ghosts, events, leagues  # ← incluye customize
 from app.services.cache import cache
+from app.services.ndjson_append import SavedataBusy
+from app.services.watcher import watcher
+from app.services.write_queue import write_queue
 
 app = FastAPI(title="PIU/DDR Scores (NDJSON)")
 
+# ETag / 304 + cache de respuestas serializadas para endpoints de lectura
+# (antes que CORS: CORS queda por fuera y también decora lo que sale del cache)
+app.middleware("http")(etag_middleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,  # p.ej. ["http://localhost:5173"]
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],  # paginación legible desde el frontend
 )
 
 # Routers de autenticación/perfil/customize
@@ -24,12 +34,32 @@ app.include_router(customize.router)  # /me/customize  ← importa y monta
 app.include_router(scores.router)
 app.include_router(songs.router)                
 app.include_router(stats.router)
+app.include_router(search.router)       # /search (autocompletado)
+app.include_router(live.router)         # /live (WebSocket) y /live/sse
+app.include_router(ghosts.router)       # /ghosts (ghost3 decodificado y comparación)
+app.include_router(events.router)       # /events (progreso de event3)
+app.include_router(leagues.router)      # /leagues (leagueresult3 por período y clase)
+
+# Guardado que no se pudo escribir ahora (lock ocupado o línea a medias del juego):
+# no quedó nada escrito y el cliente puede reintentar
+@app.exception_handler(SavedataBusy)
+def _savedata_busy(request: Request, exc: SavedataBusy):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
 @app.on_event("startup")
 def _startup():
-    cache.force_reload()
+    cache.warm_start()   # sidecar + cola nueva (o recarga completa)
+    cache.save_sidecar()
+    watcher.start()   # recargas fuera del camino de los requests
+    write_queue.start()   # escritor único (group commit) de profile3/customize3
     print(">>> NDJSON_PATH =", settings.NDJSON_PATH)  # debug útil
 
+@app.on_event("shutdown")
+def _shutdown():
+    write_queue.stop()   # escribe lo pendiente antes de salir
+    watcher.stop()
+    cache.save_sidecar()
+
 @app.get("/healthz")
 def healthz():
     return {"ok": True}
@@ -0,0 +1,201 @@
+# app/services/activity.py
+from __future__ import annotations
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+from app.services.score_store import NONE, ScoreView
+
+HOUR = 3_600_000
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+WEEK_OFFSET = 4 * DAY   # el epoch cae jueves: las semanas empiezan el lunes (UTC)
+
+# Tamaños de bucket soportados (ms), de más fino a más grueso
+BUCKETS: Dict[str, int] = {"hour": HOUR, "day": DAY, "week": WEEK}
+
+# Un nivel de Buckets: (inicios ordenados, plays antes de cada bucket, n, total)
+Level = Tuple[array, array, int, int]
+
+# Alcance de un conteo: (tipo, id); el global usa id 0
+Scope = Tuple[int, int]
+ALL, DANCER, SONG = 0, 1, 2
+
+_EMPTY: Mapping[int, "Buckets"] = MappingProxyType({})
+
+
+def bucket_start(ms: int, size: int) -> int:
+    off = WEEK_OFFSET if size == WEEK else 0
+    return (ms - off) // size * size + off
+
+
+def _ceil(ms: int, size: int) -> int:
+    b = bucket_start(ms, size)
+    return b if b == ms else b + size
+
+
+class Buckets:
+    """
+    Conteos por hora, día y semana (UTC) de un alcance: todo, un dancer o una
+    canción. Inmutable: por nivel guarda los inicios de bucket no vacíos
+    ordenados, los plays anteriores a cada bucket, cuántos buckets le tocan
+    (n) y el total, así total() y series() son bisect sobre esos arrays y no
+    dependen del ancho del rango pedido.
+
+    Los arrays son append-only y se comparten con los Buckets que salen de
+    extended(): cada uno lee solo sus primeros n y tiene su propio total,
+    así sumar plays al último bucket o agregar buckets detrás no cambia lo
+    que ve un snapshot anterior.
+    """
+
+    __slots__ = ("levels", "first", "last")
+
+    def __init__(self, hours: Mapping[int, int], first: int, last: int) -> None:
+        self.first = first   # ms del registro más viejo / más nuevo
+        self.last = last
+        # size -> (inicios ordenados, plays antes de cada bucket, n, total)
+        self.levels: Dict[int, Level] = {}
+        keys = sorted(hours)
+        for size in BUCKETS.values():
+            starts, before = array("q"), array("q")
+            acc = 0
+            for h in keys:
+                b = h if size == HOUR else bucket_start(h, size)
+                if not starts or starts[-1] != b:
+                    starts.append(b)
+                    before.append(acc)
+                acc += hours[h]
+            self.levels[size] = (starts, before, len(starts), acc)
+
+    def extends_to(self, hour: int) -> bool:
+        """True si plays desde `hour` en adelante se pueden sumar con extended()."""
+        starts, _, n, _ = self.levels[HOUR]
+        return n == 0 or hour >= starts[n - 1]
+
+    def extended(self, added: List[Tuple[int, int]], first: int, last: int) -> "Buckets":
+        """
+        Copia con los plays [(inicio de hora, plays)] ordenados y desde la
+        última hora (ver extends_to): O(horas nuevas), sin rehacer los arrays.
+        """
+        out = Buckets.__new__(Buckets)
+        out.first, out.last = first, last
+        out.levels = {}
+        for size, (starts, before, n, acc) in self.levels.items():
+            if len(starts) != n:   # ya se extendió desde acá: no se pisa lo ajeno
+                starts, before = starts[:n], before[:n]
+            for h, count in added:
+                b = h if size == HOUR else bucket_start(h, size)
+                if not n or starts[n - 1] != b:
+                    starts.append(b)
+                    before.append(acc)
+                    n += 1
+                acc += count
+            out.levels[size] = (starts, before, n, acc)
+        return out
+
+    def series(self, size: int, start: int, end: int) -> List[Tuple[int, int]]:
+        """[(inicio del bucket, conteo)] no vacíos que tocan [start, end)."""
+        starts, before, n, acc = self.levels[size]
+        lo = bisect_left(starts, bucket_start(start, size), 0, n)
+        hi = bisect_left(starts, end, 0, n)
+        return [(starts[i], (before[i + 1] if i + 1 < n else acc) - before[i]) for i in range(lo, hi)]
+
+    def total(self, start: int, end: int) -> int:
+        """Plays en [start, end) con precisión de hora: dos bisect, O(log buckets)."""
+        start = bucket_start(start, HOUR)
+        end = _ceil(end, HOUR)
+        if start >= end:
+            return 0
+        starts, before, n, acc = self.levels[HOUR]
+        hi = bisect_left(starts, end, 0, n)
+        lo = bisect_left(starts, start, 0, n)
+        return (before[hi] if hi < n else acc) - (before[lo] if lo < n else acc)
+
+
+class ActivityView:
+    """Lo que ve un snapshot: Buckets congelados global, por dancer y por canción."""
+
+    __slots__ = ("overall", "by_dancer", "by_song")
+
+    def __init__(
+        self,
+        overall: Optional[Buckets] = None,
+        by_dancer: Mapping[int, Buckets] = _EMPTY,
+        by_song: Mapping[int, Buckets] = _EMPTY,
+    ) -> None:
+        self.overall = overall
+        self.by_dancer = MappingProxyType(by_dancer)
+        self.by_song = MappingProxyType(by_song)
+
+    def __reduce__(self):   # MappingProxyType no es picklable (sidecar)
+        return ActivityView, (self.overall, dict(self.by_dancer), dict(self.by_song))
+
+
+class ActivityIndex:
+    """
+    Índice temporal de plays de un ScoreStore (fecha = updatedAt o createdAt),
+    global, por dancer y por canción.
+
+    extend() solo agrega la fecha de cada fila nueva al array pendiente de
+    sus alcances; frozen() vuelca los pendientes en los conteos por hora y
+    da Buckets nuevos únicamente a los alcances que cambiaron: si los plays
+    caen desde la última hora (lo normal al ingerir la cola) se extienden
+    los anteriores en O(horas nuevas); si no, se rearman desde los conteos.
+    Cada snapshot se queda con su ActivityView y nunca ve plays posteriores.
+    """
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self._pending: Dict[Scope, array] = {}           # ms aún no congelados
+        self._hours: Dict[Scope, Dict[int, int]] = {}     # inicio de hora -> plays
+        self._span: Dict[Scope, Tuple[int, int]] = {}     # (primer ms, último ms)
+        self._view = ActivityView()
+
+    def extend(self, view: ScoreView) -> None:
+        cols = view.cols
+        upd, cre = cols["updated_at"], cols["created_at"]
+        dancers, songs = cols["dancer"], cols["song_id"]
+        pending = self._pending
+        for i in range(self.rows, view.n):
+            ms = upd[i] if upd[i] != NONE else cre[i]
+            if ms == NONE:
+                continue
+            for scope in ((ALL, 0), (DANCER, dancers[i]), (SONG, songs[i])):
+                arr = pending.get(scope)
+                if arr is None:
+                    arr = pending[scope] = array("q")
+                arr.append(ms)
+        self.rows = max(self.rows, view.n)
+
+    def frozen(self) -> ActivityView:
+        """Vista inmutable para el snapshot (la misma si no hubo plays nuevos)."""
+        if not self._pending:
+            return self._view
+        prev = self._view
+        overall = prev.overall
+        groups = {DANCER: dict(prev.by_dancer), SONG: dict(prev.by_song)}
+        for scope, ms in self._pending.items():
+            hours = self._hours.get(scope)
+            if hours is None:
+                hours = self._hours[scope] = {}
+            added = Counter([m - m % HOUR for m in ms])
+            for h, n in added.items():
+                hours[h] = hours.get(h, 0) + n
+            lo, hi = min(ms), max(ms)
+            span = self._span.get(scope)
+            if span is not None:
+                lo, hi = min(lo, span[0]), max(hi, span[1])
+            self._span[scope] = (lo, hi)
+            cur = overall if scope[0] == ALL else groups[scope[0]].get(scope[1])
+            if cur is not None and cur.extends_to(min(added)):
+                buckets = cur.extended(sorted(added.items()), lo, hi)   # caso común: plays recientes
+            else:
+                buckets = Buckets(hours, lo, hi)
+            if scope[0] == ALL:
+                overall = buckets
+            else:
+                groups[scope[0]][scope[1]] = buckets
+        self._pending = {}
+        self._view = ActivityView(overall, groups[DANCER], groups[SONG])
+        return self._view
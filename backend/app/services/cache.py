@@ -1,91 +1,375 @@
 # app/services/cache.py
 from __future__ import annotations
+import hashlib
 import json
 import os
-from typing import Any, Dict, List, Optional, Union
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, List, Optional, Set, Tuple
 from app.core.config import settings
+from app.services import sidecar
+from app.services.ingest import IngestState, aligned_end, load_parallel
+from app.services.latest_state import LatestCustomize, LatestProfiles
+from app.services.activity import ActivityIndex
+from app.services.dancer_join import DancerJoin
+from app.services.dancer_stats import DancerStats
+from app.services.leaderboard import Leaderboards, Move
+from app.services.level_matrix import chart_levels
+from app.services.live import live_hub
+from app.services.score_index import ScoreIndex
+from app.services.score_store import NONE, ScoreView
+from app.services.search import SearchIndex
+from app.services.snapshot import Json, Key, Snapshot
 
-Json = Dict[str, Any]
-Key = Union[int, str]
+# Bytes usados para la huella del archivo (inicio y final de lo ya consumido)
+FINGERPRINT_BYTES = 4096
 
 
 class Cache:
+    """
+    Dueño del estado construido desde songs.json y el NDJSON.
+
+    Solo quien tiene _reload_lock modifica el estado interno (builder); los
+    lectores usan snapshot(), que devuelve un Snapshot inmutable publicado con
+    una sola asignación de referencia.
+    """
+
     def __init__(self) -> None:
-        # Índices de canciones
-        self.songs_by_mcode: Dict[Key, Json] = {}
+        self._snap = Snapshot()
+
+        # Estado del builder (índices de canciones y lo ingerido del NDJSON)
+        self._songs_by_mcode: Dict[Key, Json] = {}
+        self._state = IngestState()
+        self._dirty = False   # hay cambios sin publicar
+        self._live_ready = False   # ya hay un estado publicado sobre el cual avisar novedades
 
-        # Datos crudos del NDJSON
-        self.scores: List[Json] = []    # score3
-        self.hiscores: List[Json] = []  # hiscore3
+        # Índices derivados: se actualizan al publicar solo con las filas nuevas
+        self._derived_rows: Tuple[int, int] = (0, 0)   # (score3, hiscore3) ya procesadas
+        self._joins = (DancerJoin(), DancerJoin())     # columna "dancer" de score3 / hiscore3
+        self._profile_names: Tuple[Dict[str, str], Dict[str, str]] = ({}, {})
+        self._boards = (Leaderboards(), Leaderboards())   # top por chart de score3 / hiscore3
+        self._indexes = (ScoreIndex(), ScoreIndex())       # filas por dancer / canción para /scores
+        self._stats = (DancerStats(), DancerStats())       # contadores de /stats/dancers
+        self._activity = (ActivityIndex(), ActivityIndex())  # plays por hora/día/semana
+        self._dancer_names: Set[str] = set()
+        self._songs_meta: Dict[int, Json] = {}
+        self._chart_levels: Dict[Tuple[int, int, int], int] = {}
+        self._search = SearchIndex()
+        self._songs_changed = False
+        self._songs_version = 0
 
-        # Índices de perfiles para recuperar dancerName
-        self.profiles_by_refid: Dict[str, Json] = {}
-        self.profiles_by_pcbid: Dict[str, Json] = {}
+        # Identifica este proceso: las versiones vuelven a 1 al reiniciar,
+        # así que los ETags las combinan con esto para no repetirse
+        self.boot_id = format(time.time_ns(), "x")
 
         # mtimes para recarga condicional
         self._songs_mtime: Optional[float] = None
         self._ndjson_mtime: Optional[float] = None
 
+        # Estado de ingesta incremental del NDJSON:
+        # offset en bytes ya consumido + identidad del archivo para detectar
+        # reescrituras (compactación estilo NeDB) o truncados.
+        self._ndjson_offset: int = 0
+        self._ndjson_ident: Optional[Tuple[int, int]] = None   # (st_dev, st_ino)
+        self._ndjson_stat: Optional[Tuple[int, int]] = None    # (st_size, st_mtime_ns)
+        self._ndjson_head: Optional[str] = None   # hash de los primeros bytes
+        self._ndjson_tail: Optional[str] = None   # hash de los bytes previos al offset
+
+        # Una sola recarga a la vez (watcher, startup o llamadas manuales)
+        self._reload_lock = threading.Lock()
+
+        # Líneas profile3/customize3 escritas por nosotros que el snapshot
+        # publicado quizás no tiene aún: (generación, offset final, objeto).
+        # Tupla reemplazada entera (copy-on-write); se lee sin lock.
+        self._appended: Tuple[Tuple[int, int, Json], ...] = ()
+        self._appended_lock = threading.Lock()
+        self._ndjson_generation = 0   # sube en cada reconstrucción desde el byte 0
+
+        # Métricas de recarga (se exponen en /stats/cache)
+        self.reload_count: int = 0
+        self.last_reload_ms: Optional[float] = None
+        self.last_reload_at: Optional[float] = None   # epoch (s)
+
     # ---------- API pública ----------
+    def snapshot(self) -> Snapshot:
+        """Estado actual; tomarlo una vez por request y usarlo de principio a fin."""
+        return self._snap
+
+    # ---------- último estado por jugador (/me, /auth) ----------
+    def latest_profile(self, linked: Json) -> Optional[Json]:
+        """Último profile3 del jugador (por __refid, ddrCode o dancerName). No modificarlo."""
+        own, snap = self._own_appends("profile3")
+        found = _profiles(own).match(linked)
+        return found if found is not None else snap.latest_profiles.match(linked)
+
+    def profile_by_refid(self, refid: str) -> Optional[Json]:
+        own, snap = self._own_appends("profile3")
+        found = _profiles(own).by_ref(refid)
+        return found if found is not None else snap.latest_profiles.by_ref(refid)
+
+    def latest_customize(self, refid: str) -> Dict[Tuple[int, int], object]:
+        """{(category, pattern): key} de las últimas customize3 del jugador (copia)."""
+        own, snap = self._own_appends("customize3")
+        pairs = snap.customize.get(refid)
+        extra = LatestCustomize()
+        for obj in own:
+            extra.add(obj)
+        pairs.update(extra.get(refid))
+        return pairs
+
+    def note_appended(self, objs: List[Json], end: int) -> None:
+        """
+        Recuerda las líneas profile3/customize3 que acabamos de agregar al
+        NDJSON (el bloque termina en el byte `end`) para leerlas de inmediato,
+        sin esperar al watcher ni tomar _reload_lock: las lecturas las aplican
+        sobre el snapshot hasta que uno publicado ya las incluye (ver _publish).
+        """
+        gen = self._ndjson_generation   # después de escribir: una reconstrucción posterior las incluye
+        fresh = tuple((gen, end, obj) for obj in objs if obj.get("collection") in ("profile3", "customize3"))
+        if fresh:
+            with self._appended_lock:
+                self._appended = self._appended + fresh
+
+    def _own_appends(self, collection: str) -> Tuple[List[Json], Snapshot]:
+        """
+        Líneas propias de `collection` que el snapshot todavía no ingirió (en
+        orden) y ese snapshot. Se lee la tupla ANTES que el snapshot: si en
+        medio se publica uno nuevo y se purga, el nuevo ya las trae.
+        """
+        appended = self._appended
+        snap = self._snap
+        own = [obj for gen, end, obj in appended
+               if obj.get("collection") == collection and not _covers(snap, gen, end)]
+        return own, snap
+
     def force_reload(self) -> None:
         """Recarga todo sin mirar mtimes."""
-        self._load_songs()
-        self._load_ndjson()
-        self._songs_mtime = self._safe_mtime(settings.SONGS_DICT_PATH)
-        self._ndjson_mtime = self._safe_mtime(settings.NDJSON_PATH)
+        with self._reload_lock:
+            t0 = time.perf_counter()
+            self._load_songs()
+            self._load_ndjson()
+            self._songs_mtime = self._safe_mtime(settings.SONGS_DICT_PATH)
+            self._ndjson_mtime = self._safe_mtime(settings.NDJSON_PATH)
+            self._publish()
+            self._record_reload(t0)
+
+    def warm_start(self) -> bool:
+        """
+        Arranque rápido: si el sidecar coincide con la huella del NDJSON se
+        cargan sus índices (lo ingerido y los derivados: leaderboards,
+        ScoreIndex, contadores, actividad, búsqueda) y solo se procesa la
+        cola agregada desde entonces.
+        Si no hay sidecar válido hace una recarga completa.
+        Devuelve True si se usó el sidecar.
+        """
+        with self._reload_lock:
+            t0 = time.perf_counter()
+            payload = sidecar.load(sidecar.sidecar_path()) if settings.INDEX_SIDECAR else None
+            restored = payload is not None and self._restore(payload)
+            if not restored:
+                self._load_songs()
+                self._songs_mtime = self._safe_mtime(settings.SONGS_DICT_PATH)
+                self._load_ndjson()
+            else:
+                self._refresh_ndjson()
+            self._ndjson_mtime = self._safe_mtime(settings.NDJSON_PATH)
+            self._publish()
+            self._record_reload(t0)
+        return restored
+
+    def save_sidecar(self) -> None:
+        """Persiste el estado ingerido, los índices derivados, offset y huella junto al NDJSON."""
+        if not settings.INDEX_SIDECAR:
+            return
+        with self._reload_lock:
+            if not self._ndjson_offset:
+                return
+            payload = {
+                "ndjson": {
+                    "offset": self._ndjson_offset,
+                    "head": self._ndjson_head,
+                    "tail": self._ndjson_tail,
+                },
+                "state": self._state,
+                # derivados al día con _derived_rows: al restaurar solo se procesan filas posteriores
+                "derived": {
+                    "rows": self._derived_rows,
+                    "joins": self._joins,
+                    "profile_names": self._profile_names,
+                    "boards": self._boards,
+                    "indexes": self._indexes,
+                    "stats": self._stats,
+                    "activity": self._activity,
+                    "dancer_names": self._dancer_names,
+                    "search": self._search,
+                },
+                "songs": {"mtime": self._songs_mtime, "by_mcode": self._songs_by_mcode},
+            }
+            try:
+                sidecar.save(sidecar.sidecar_path(), payload)
+            except OSError as e:
+                print(">>> no se pudo escribir el sidecar:", e)
 
     def load_if_changed(self) -> None:
-        """Recarga solo si cambió alguno de los archivos en disco."""
-        cur_songs_m = self._safe_mtime(settings.SONGS_DICT_PATH)
-        cur_ndjson_m = self._safe_mtime(settings.NDJSON_PATH)
+        """
+        Recarga solo si cambió alguno de los archivos en disco.
+        El NDJSON se ingiere de forma incremental: solo se parsean las líneas
+        agregadas desde la última pasada (ver _refresh_ndjson).
+        Lo llama el watcher (app/services/watcher.py), no los endpoints.
+        Solo las pasadas que ingirieron o reconstruyeron algo cuentan en reload_count.
+        """
+        with self._reload_lock:
+            t0 = time.perf_counter()
+            cur_songs_m = self._safe_mtime(settings.SONGS_DICT_PATH)
 
-        if self._songs_mtime is None or (cur_songs_m is not None and cur_songs_m != self._songs_mtime):
-            self._load_songs()
-            self._songs_mtime = cur_songs_m
+            if self._songs_mtime is None or (cur_songs_m is not None and cur_songs_m != self._songs_mtime):
+                self._load_songs()
+                self._songs_mtime = cur_songs_m
 
-        if self._ndjson_mtime is None or (cur_ndjson_m is not None and cur_ndjson_m != self._ndjson_mtime):
-            self._load_ndjson()
-            self._ndjson_mtime = cur_ndjson_m
+            self._refresh_ndjson()
+            changed = self._dirty
+            self._publish()
+            if changed:
+                self._record_reload(t0)
 
-    def song_meta(self, song_id: Key) -> Optional[Json]:
-        """Metadata del songs.json para el mcode/songId dado (acepta int o str)."""
-        if song_id in self.songs_by_mcode:
-            return self.songs_by_mcode[song_id]
-        try:
-            return self.songs_by_mcode[int(song_id)]  # type: ignore[arg-type]
-        except Exception:
-            return self.songs_by_mcode.get(str(song_id))
+    def stats(self) -> Json:
+        """Métricas de recarga para diagnóstico."""
+        snap = self._snap
+        return {
+            "version": snap.version,
+            "reload_count": self.reload_count,
+            "last_reload_ms": self.last_reload_ms,
+            "last_reload_at": self.last_reload_at,
+            "ndjson_offset": self._ndjson_offset,
+            "scores": len(snap.scores),
+            "hiscores": len(snap.hiscores),
+            "store_bytes": self._state.scores.nbytes() + self._state.hiscores.nbytes(),
+        }
+
+    # ---------- publicación ----------
+    def _publish(self) -> None:
+        """Congela el builder en un Snapshot nuevo y lo publica (swap atómico)."""
+        if not self._dirty:
+            return
+        # el feed en vivo solo recibe lo agregado sobre un estado ya publicado;
+        # si el NDJSON se reconstruyó desde cero se avisa un resync
+        live = self._live_ready and live_hub.has_subscribers()
+        rebuilt = not self._live_ready and self._snap.version > 0
+        prev = self._derived_rows
+        scores, hiscores, moves = self._update_derived(track=live)
+        self._snap = Snapshot(
+            version=self._snap.version + 1,
+            songs_version=self._songs_version,
+            scores=scores,
+            hiscores=hiscores,
+            score_boards=MappingProxyType(self._boards[0].boards),
+            hiscore_boards=MappingProxyType(self._boards[1].boards),
+            score_index=self._indexes[0],
+            hiscore_index=self._indexes[1],
+            score_stats=MappingProxyType(self._stats[0].frozen()),
+            hiscore_stats=MappingProxyType(self._stats[1].frozen()),
+            score_activity=self._activity[0].frozen(),
+            hiscore_activity=self._activity[1].frozen(),
+            profiles_by_refid=MappingProxyType(dict(self._state.profiles_by_refid)),
+            profiles_by_pcbid=MappingProxyType(dict(self._state.profiles_by_pcbid)),
+            songs_by_mcode=MappingProxyType(self._songs_by_mcode),
+            songs_meta=MappingProxyType(self._songs_meta),
+            chart_levels=MappingProxyType(self._chart_levels),
+            ghosts=self._state.ghosts.frozen(),
+            events_by_refid=MappingProxyType(self._state.events.by_refid.frozen()),
+            events_by_id=MappingProxyType(self._state.events.by_event.frozen()),
+            leagues=MappingProxyType(self._state.leagues.by_league.frozen()),
+            leagues_by_refid=MappingProxyType(self._state.leagues.by_refid.frozen()),
+            unified=self._state.unified.frozen(),
+            latest_profiles=self._state.latest_profiles.frozen(),
+            customize=self._state.customize.frozen(),
+            ndjson_offset=self._ndjson_offset,
+            ndjson_generation=self._ndjson_generation,
+            search=self._search,
+        )
+        self._dirty = False
+        self._live_ready = True
+        # las líneas propias que este snapshot ya incluye dejan de aplicarse aparte
+        with self._appended_lock:
+            snap = self._snap
+            self._appended = tuple(e for e in self._appended if not _covers(snap, e[0], e[1]))
+        if live:
+            live_hub.publish(self._snap, ((prev[0], len(scores)), (prev[1], len(hiscores))), moves)
+        elif rebuilt:
+            live_hub.resync(self._snap)
 
-    def dancer_name_for(self, obj: Json) -> Optional[str]:
+    def _update_derived(self, track: bool = False) -> Tuple[ScoreView, ScoreView, List[List[Move]]]:
         """
-        Recupera dancerName para un score/hiscore:
-        1) Usa el que venga en el objeto si existe
-        2) Busca por __refid en profile3
-        3) Busca por pcbid en profile3
+        Actualiza los índices derivados con las filas ingeridas desde la última
+        publicación. Devuelve las vistas (score3, hiscore3) a publicar y, con
+        `track`, los cambios de posición en leaderboards de cada una.
         """
-        name = obj.get("dancerName")
-        if isinstance(name, str) and name.strip():
-            return name
+        st = self._state
+        stores = (st.scores, st.hiscores)
+        n0, h0 = self._derived_rows
 
-        refid = obj.get("__refid") or obj.get("refid")
-        if isinstance(refid, str):
-            prof = self.profiles_by_refid.get(refid)
-            if prof:
-                n = prof.get("dancerName")
-                if isinstance(n, str) and n.strip():
-                    return n
+        # join con profile3: si cambió algún nombre, solo se re-resuelven esos grupos
+        names = (_names_by(st.profiles_by_refid), _names_by(st.profiles_by_pcbid))
+        rejoined = (0, 0)
+        if names != self._profile_names:
+            self._profile_names = names
+            rejoined = tuple(join.rejoin(self._resolve_dancer) for join in self._joins)
+        for join, store in zip(self._joins, stores):
+            join.extend(store, self._resolve_dancer)
+        views = tuple(store.view(dancer=join.col) for join, store in zip(self._joins, stores))
 
-        pcbid = obj.get("pcbid")
-        if isinstance(pcbid, str):
-            prof = self.profiles_by_pcbid.get(pcbid)
-            if prof:
-                n = prof.get("dancerName")
-                if isinstance(n, str) and n.strip():
-                    return n
+        # leaderboards e índices por dancer: solo filas nuevas;
+        # si un renombre movió filas de jugador se rearman
+        boards, indexes, stats = list(self._boards), list(self._indexes), list(self._stats)
+        activity = list(self._activity)
+        moves: List[List[Move]] = []
+        for k, (view, start) in enumerate(zip(views, (n0, h0))):
+            if rejoined[k]:
+                boards[k], indexes[k], stats[k] = Leaderboards(), ScoreIndex(), DancerStats()
+                activity[k] = ActivityIndex()
+                start = 0
+            moves.append(boards[k].extend(view, track=track))
+            indexes[k].extend(view)
+            activity[k].extend(view)
+            # contadores por dancer: delta de filas nuevas + mejores por chart reemplazados
+            stats[k].add_rows(view, start, view.n)
+            stats[k].apply(view, moves[k])
+        self._boards = (boards[0], boards[1])
+        self._indexes = (indexes[0], indexes[1])
+        self._stats = (stats[0], stats[1])
+        self._activity = (activity[0], activity[1])
 
-        return None
+        # nombres de bailarines (scores + profile3) para el índice de búsqueda
+        known = len(self._dancer_names)
+        for join, start in zip(self._joins, (n0, h0)):
+            for nid in set(join.col[start:]):
+                if nid != NONE:
+                    self._dancer_names.add(st.strings.values[nid])
+        self._dancer_names.update(names[0].values())
+        if self._songs_changed or len(self._dancer_names) != known:
+            self._search = SearchIndex(_unique_songs(self._songs_by_mcode), self._dancer_names)
+            self._songs_changed = False
+
+        self._derived_rows = (len(st.scores), len(st.hiscores))
+        return views[0], views[1], moves
+
+    def _resolve_dancer(self, refid_id: int, pcbid_id: int) -> int:
+        """Nombre (id internado) desde profile3 por __refid y luego por pcbid."""
+        strings = self._state.strings
+        for sid, by in ((refid_id, self._profile_names[0]), (pcbid_id, self._profile_names[1])):
+            if sid != NONE:
+                name = by.get(strings.values[sid])
+                if name:
+                    return strings.intern(name)
+        return NONE
 
     # ---------- util ----------
+    def _record_reload(self, t0: float) -> None:
+        self.reload_count += 1
+        self.last_reload_ms = round((time.perf_counter() - t0) * 1000, 3)
+        self.last_reload_at = time.time()
+
     def _safe_mtime(self, path: str) -> Optional[float]:
         try:
             return os.path.getmtime(path)
@@ -126,45 +410,215 @@ class Cache:
                 except Exception:
                     pass
 
-        self.songs_by_mcode = by
+        self._songs_by_mcode = by
+        self._songs_meta = _served_meta(by)
+        self._chart_levels = chart_levels(self._songs_meta)
+        self._songs_changed = True
+        self._songs_version += 1
+        self._dirty = True
 
     def _load_ndjson(self) -> None:
         """
         Lee NDJSON (un JSON por línea) y separa score3 / hiscore3.
         Indexa también perfiles para dancerName por __refid/pcbid.
+        Reconstrucción completa: descarta lo ingerido y parte desde el byte 0.
         """
-        scores: List[Json] = []
-        his: List[Json] = []
-        by_refid: Dict[str, Json] = {}
-        by_pcbid: Dict[str, Json] = {}
+        self._reset_ndjson_state()
+        self._refresh_ndjson()
 
-        with open(settings.NDJSON_PATH, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                except Exception:
-                    continue
+    def _refresh_ndjson(self) -> None:
+        """
+        Ingiere solo el tramo agregado al NDJSON desde la última pasada.
+        Si el archivo fue reemplazado, truncado o reescrito (cambia el inodo,
+        el tamaño baja del offset o no coincide la huella), reconstruye todo.
+        Una última línea sin salto de línea (escritura a medias) se deja para la próxima.
+        """
+        path = settings.NDJSON_PATH
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+
+        ident = (st.st_dev, st.st_ino)
+        stat_sig = (st.st_size, st.st_mtime_ns)
+        # tamaño + mtime_ns (no solo mtime): detecta cambios dentro del mismo tick
+        if self._ndjson_ident == ident and self._ndjson_stat == stat_sig:
+            return
+
+        with open(path, "rb") as f:
+            if self._ndjson_offset and not self._same_source(f, ident, st.st_size):
+                self._reset_ndjson_state()
+
+            # carga en frío grande: tramos alineados a línea en un pool de procesos
+            if self._ndjson_offset == 0 and self._use_parallel(st.st_size):
+                end = aligned_end(f, st.st_size)
+                self._state = load_parallel(
+                    path, end, settings.INGEST_WORKERS, settings.INGEST_CHUNK_BYTES
+                )
+                self._ndjson_offset = end
+                self._dirty = True
+
+            f.seek(self._ndjson_offset)
+            chunk = f.read()
+
+            # solo consumimos hasta el último salto de línea completo
+            cut = chunk.rfind(b"\n") + 1
+            if cut:
+                self._state.ingest(chunk[:cut].splitlines(keepends=True), self._ndjson_offset)
+                self._ndjson_offset += cut
+                self._dirty = True
+            self._ndjson_head, self._ndjson_tail = self._fingerprint(f, self._ndjson_offset)
+
+        self._ndjson_ident = ident
+        # si quedó una línea a medias no fijamos la firma, así se reintenta
+        self._ndjson_stat = stat_sig if cut == len(chunk) else None
+
+    @staticmethod
+    def _use_parallel(size: int) -> bool:
+        return settings.INGEST_WORKERS > 1 and size > settings.INGEST_CHUNK_BYTES
+
+    def _same_source(self, f, ident: Tuple[int, int], size: int) -> bool:
+        """True si el archivo sigue siendo el que ya consumimos (solo creció)."""
+        if ident != self._ndjson_ident or size < self._ndjson_offset:
+            return False
+        head, tail = self._fingerprint(f, self._ndjson_offset)
+        return head == self._ndjson_head and tail == self._ndjson_tail
+
+    @staticmethod
+    def _fingerprint(f, offset: int) -> Tuple[str, str]:
+        """Hash de los primeros y de los últimos FINGERPRINT_BYTES antes de offset."""
+        f.seek(0)
+        head = hashlib.blake2b(f.read(min(offset, FINGERPRINT_BYTES)), digest_size=16).hexdigest()
+        start = max(0, offset - FINGERPRINT_BYTES)
+        f.seek(start)
+        tail = hashlib.blake2b(f.read(offset - start), digest_size=16).hexdigest()
+        return head, tail
+
+    def _restore(self, payload: Json) -> bool:
+        """Adopta el estado del sidecar si el NDJSON sigue empezando igual."""
+        src = payload.get("ndjson") or {}
+        state = payload.get("state")
+        offset = src.get("offset")
+        if not isinstance(state, IngestState) or not isinstance(offset, int):
+            return False
+        try:
+            st = os.stat(settings.NDJSON_PATH)
+            if st.st_size < offset:
+                return False
+            with open(settings.NDJSON_PATH, "rb") as f:
+                if self._fingerprint(f, offset) != (src.get("head"), src.get("tail")):
+                    return False
+        except OSError:
+            return False
+
+        self._reset_ndjson_state()
+        self._state = state
+        self._ndjson_offset = offset
+        self._ndjson_ident = (st.st_dev, st.st_ino)
+        self._ndjson_head, self._ndjson_tail = src["head"], src["tail"]
 
-                col = obj.get("collection")
-                if col == "score3":
-                    scores.append(obj)
-                elif col == "hiscore3":
-                    his.append(obj)
-                elif col == "profile3":
-                    refid = obj.get("__refid") or obj.get("refid")
-                    if isinstance(refid, str):
-                        by_refid[refid] = obj
-                    pcbid = obj.get("pcbid")
-                    if isinstance(pcbid, str):
-                        by_pcbid[pcbid] = obj
-
-        self.scores = scores
-        self.hiscores = his
-        self.profiles_by_refid = by_refid
-        self.profiles_by_pcbid = by_pcbid
+        derived = payload.get("derived")
+        if isinstance(derived, dict):
+            self._restore_derived(derived)
+
+        # catálogo de canciones: se reutiliza si songs.json no cambió
+        songs = payload.get("songs") or {}
+        cur_songs_m = self._safe_mtime(settings.SONGS_DICT_PATH)
+        if songs.get("by_mcode") and songs.get("mtime") == cur_songs_m:
+            self._songs_by_mcode = songs["by_mcode"]
+            self._songs_meta = _served_meta(self._songs_by_mcode)
+            self._chart_levels = chart_levels(self._songs_meta)
+            # el índice de búsqueda guardado ya tiene este catálogo
+            self._songs_changed = not isinstance(derived, dict)
+            self._songs_version += 1
+        else:
+            self._load_songs()
+        self._songs_mtime = cur_songs_m
+        return True
+
+    def _restore_derived(self, derived: Json) -> None:
+        """Adopta los índices derivados guardados junto al estado (mismo pickle, mismas filas)."""
+        self._derived_rows = derived["rows"]
+        self._joins = derived["joins"]
+        self._profile_names = derived["profile_names"]
+        self._boards = derived["boards"]
+        self._indexes = derived["indexes"]
+        self._stats = derived["stats"]
+        self._activity = derived["activity"]
+        self._dancer_names = derived["dancer_names"]
+        self._search = derived["search"]
+
+    def _reset_ndjson_state(self) -> None:
+        self._ndjson_generation += 1
+        self._state = IngestState()
+        self._dirty = True
+        self._live_ready = False
+        self._derived_rows = (0, 0)
+        self._joins = (DancerJoin(), DancerJoin())
+        self._profile_names = ({}, {})
+        self._boards = (Leaderboards(), Leaderboards())
+        self._indexes = (ScoreIndex(), ScoreIndex())
+        self._stats = (DancerStats(), DancerStats())
+        self._activity = (ActivityIndex(), ActivityIndex())
+        self._dancer_names = set()
+        self._ndjson_offset = 0
+        self._ndjson_ident = None
+        self._ndjson_stat = None
+        self._ndjson_head = None
+        self._ndjson_tail = None
+
+
+def _profiles(objs: List[Json]) -> LatestProfiles:
+    out = LatestProfiles()
+    for obj in objs:
+        out.add(obj)
+    return out
+
+
+def _covers(snap: Snapshot, gen: int, end: int) -> bool:
+    """True si el snapshot ya ingirió una línea escrita hasta `end` en la generación `gen`."""
+    return snap.ndjson_generation > gen or (snap.ndjson_generation == gen and snap.ndjson_offset >= end)
+
+
+def _unique_songs(by: Dict[Key, Json]) -> List[Tuple[Key, Json]]:
+    """songs_by_mcode guarda cada canción bajo int y str; deja una entrada por canción."""
+    seen: Set[int] = set()
+    out: List[Tuple[Key, Json]] = []
+    for k, v in by.items():
+        if id(v) in seen:
+            continue
+        seen.add(id(v))
+        out.append((v.get("mcode", k), v))
+    return out
+
+
+def _names_by(profiles: Dict[str, Json]) -> Dict[str, str]:
+    """{clave: dancerName} de los profile3 que tienen nombre."""
+    out: Dict[str, str] = {}
+    for k, prof in profiles.items():
+        n = prof.get("dancerName")
+        if isinstance(n, str) and n.strip():
+            out[k] = n
+    return out
+
+
+def _served_meta(by: Dict[Key, Json]) -> Dict[int, Json]:
+    """songMeta tal como la sirve /scores, una instancia compartida por canción."""
+    out: Dict[int, Json] = {}
+    for mcode, meta in _unique_songs(by):
+        try:
+            key = int(mcode)
+        except Exception:
+            continue
+        out[key] = {
+            "title": meta.get("title"),
+            "name": meta.get("name") or meta.get("title"),
+            "basename": meta.get("basename"),
+            "series": meta.get("series"),
+            "bpm": meta.get("bpm"),
+            "diffLv": meta.get("diffLv"),
+        }
+    return out
 
 
 # instancia global
@@ -0,0 +1,64 @@
+# app/services/dancer_join.py
+from __future__ import annotations
+from array import array
+from typing import Callable, Dict, List, Tuple
+from app.services.score_store import NONE, ScoreStore
+
+# resolve(refid_id, pcbid_id) -> id internado del nombre (o NONE)
+Resolver = Callable[[int, int], int]
+
+
+class DancerJoin:
+    """
+    Columna derivada "dancer" de un ScoreStore: id internado del dancerName a
+    mostrar, resuelto una vez al ingerir (nombre propio > profile3 por
+    __refid > profile3 por pcbid).
+
+    Las filas sin nombre propio se agrupan por (refid, pcbid); cuando cambia
+    un profile3 solo se re-resuelven esos grupos y se reescriben sus filas.
+    """
+
+    def __init__(self) -> None:
+        self.col = array("i")
+        self._groups: Dict[Tuple[int, int], List[int]] = {}
+        self._resolved: Dict[Tuple[int, int], int] = {}
+
+    def extend(self, store: ScoreStore, resolve: Resolver) -> None:
+        """Resuelve las filas del store que todavía no están en la columna."""
+        cols = store.cols
+        names, refids, pcbids = cols["name"], cols["refid"], cols["pcbid"]
+        for i in range(len(self.col), len(store)):
+            nid = names[i]
+            if nid == NONE:
+                key = (refids[i], pcbids[i])
+                rows = self._groups.get(key)
+                if rows is None:
+                    rows = self._groups[key] = []
+                    self._resolved[key] = resolve(*key)
+                rows.append(i)
+                nid = self._resolved[key]
+            self.col.append(nid)
+
+    def rejoin(self, resolve: Resolver) -> int:
+        """
+        Re-resuelve los grupos tras un cambio en profile3. Si algo cambió,
+        trabaja sobre una copia de la columna (los snapshots publicados
+        conservan la anterior). Devuelve cuántas filas se reescribieron.
+        """
+        changed = []
+        for key in self._groups:
+            nid = resolve(*key)
+            if nid != self._resolved[key]:
+                changed.append((key, nid))
+        if not changed:
+            return 0
+
+        col = array("i", self.col)
+        touched = 0
+        for key, nid in changed:
+            self._resolved[key] = nid
+            for i in self._groups[key]:
+                col[i] = nid
+            touched += len(self._groups[key])
+        self.col = col
+        return touched
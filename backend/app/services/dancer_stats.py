@@ -0,0 +1,67 @@
+# app/services/dancer_stats.py
+from __future__ import annotations
+from array import array
+from typing import Dict, Iterable, Mapping, Tuple
+from app.services.leaderboard import ANY_DIFFICULTY, Move
+from app.services.score_store import NONE, ScoreView
+
+# Índices de clearKind relevantes
+CK_FC, CK_GFC, CK_PFC, CK_MFC = 7, 8, 9, 10
+RANK_AAA_IDX = 0  # "AAA" en el array de ranks
+
+# Contadores por dancer, en este orden
+FIELDS = ("total", "charts", "AAA", "FC", "GFC", "PFC", "MFC")
+_TOTAL, _CHARTS, _AAA = 0, 1, 2
+_LAMP_SLOT = {CK_FC: 3, CK_GFC: 4, CK_PFC: 5, CK_MFC: 6}
+
+
+class DancerStats:
+    """
+    Contadores materializados por dancer (id internado) para /stats/dancers:
+
+    - total: registros jugados (cada fila cuenta).
+    - charts / AAA / FC / GFC / PFC / MFC: sobre el MEJOR score de cada chart
+      (songId, style, difficulty). Cuando un score nuevo supera al mejor se
+      descuenta la lámpara del anterior y se suma la del nuevo.
+
+    Se alimenta con las filas nuevas y los Moves de los leaderboards por
+    dificultad, así que cada publicación cuesta O(filas nuevas).
+    """
+
+    def __init__(self) -> None:
+        self.counters: Dict[int, array] = {}
+
+    def _get(self, dancer: int) -> array:
+        c = self.counters.get(dancer)
+        if c is None:
+            c = self.counters[dancer] = array("i", bytes(4 * len(FIELDS)))
+        return c
+
+    def add_rows(self, view: ScoreView, lo: int, hi: int) -> None:
+        dancers = view.cols["dancer"]
+        for i in range(lo, hi):
+            self._get(dancers[i])[_TOTAL] += 1
+
+    def apply(self, view: ScoreView, moves: Iterable[Move]) -> None:
+        ranks, kinds = view.cols["rank"], view.cols["clear_kind"]
+        for key, dancer, _, _, row, prev in moves:
+            if key[2] == ANY_DIFFICULTY:   # solo boards por chart
+                continue
+            c = self._get(dancer)
+            if prev == NONE:
+                c[_CHARTS] += 1
+            else:
+                self._bump(c, ranks[prev], kinds[prev], -1)
+            self._bump(c, ranks[row], kinds[row], 1)
+
+    @staticmethod
+    def _bump(c: array, rank: int, kind: int, delta: int) -> None:
+        if rank == RANK_AAA_IDX:
+            c[_AAA] += delta
+        slot = _LAMP_SLOT.get(kind)
+        if slot is not None:
+            c[slot] += delta
+
+    def frozen(self) -> Mapping[int, Tuple[int, ...]]:
+        """Copia para el snapshot: O(dancers), los contadores siguen mutando en el builder."""
+        return {d: tuple(c) for d, c in self.counters.items()}
@@ -0,0 +1,152 @@
+# app/services/ghosts.py
+from __future__ import annotations
+import json
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+
+GhostKey = Tuple[str, int]   # (__refid, ghostId)
+
+# Campos de la línea ghost3 leídos sin json.loads (el string "ghost" no se toca)
+_REFID_RE = re.compile(rb'"__refid":"([^"\\]*)"')
+_GHOST_ID_RE = re.compile(rb'"ghostId":(-?\d+)')
+
+# '0'..'9' -> 0..9 (un byte por paso); cualquier otro caracter -> 0xFF (-1 como int8)
+_DIGITS = bytes(c - 48 if 48 <= c <= 57 else 255 for c in range(256))
+
+
+class GhostIndex:
+    """
+    (refid, ghostId) -> (offset, largo) de la línea ghost3 en el NDJSON.
+    Se llena al ingerir y no guarda los strings de pasos: se leen del
+    archivo recién cuando alguien pide el ghost (ver GhostStore).
+    Si un ghost aparece dos veces gana la última línea, como en profile3.
+    El builder lo modifica al ingerir; los snapshots reciben frozen().
+    """
+
+    def __init__(self) -> None:
+        self.by_key: Dict[GhostKey, Tuple[int, int]] = {}
+        self._frozen: Optional[GhostIndex] = None   # última copia publicada
+
+    def add(self, line: bytes, offset: int) -> None:
+        key = _line_key(line)
+        if key is not None:
+            self.by_key[key] = (offset, len(line))
+            self._frozen = None
+
+    def merge(self, other: "GhostIndex") -> None:
+        self.by_key.update(other.by_key)
+        self._frozen = None
+
+    def frozen(self) -> "GhostIndex":
+        """Copia para el snapshot: se rehace solo si entraron ghosts desde la anterior."""
+        if self._frozen is None:
+            copy = GhostIndex()
+            copy.by_key = dict(self.by_key)
+            copy._frozen = copy
+            self._frozen = copy
+        return self._frozen
+
+    def get(self, refid: str, ghost_id: int) -> Optional[Tuple[int, int]]:
+        return self.by_key.get((refid, ghost_id))
+
+    def __len__(self) -> int:
+        return len(self.by_key)
+
+    # la copia publicada no va al sidecar ni a los workers de la carga en paralelo
+    def __getstate__(self) -> Dict[str, object]:
+        return {"by_key": self.by_key}
+
+    def __setstate__(self, state: Dict[str, object]) -> None:
+        self.by_key = state["by_key"]  # type: ignore[assignment]
+        self._frozen = None
+
+
+def _line_key(line: bytes) -> Optional[GhostKey]:
+    refid, gid = _REFID_RE.search(line), _GHOST_ID_RE.search(line)
+    if refid is not None and gid is not None:
+        return refid.group(1).decode("utf-8", "replace"), int(gid.group(1))
+    # formato inesperado: se parsea completa
+    try:
+        obj = json.loads(line)
+        return str(obj["__refid"]), int(obj["ghostId"])
+    except Exception:
+        return None
+
+
+def decode_ghost(ghost: str) -> array:
+    """String de juicios por paso ("0201...") -> array('b') con un valor 0..9 por paso."""
+    steps = array("b")
+    steps.frombytes(ghost.encode("ascii", "replace").translate(_DIGITS))
+    return steps
+
+
+class GhostStore:
+    """
+    Decodifica ghosts bajo demanda leyendo la línea por offset, con un LRU
+    acotado (GHOST_CACHE_SIZE entradas) de los ya decodificados.
+    La clave del LRU incluye el offset: si el NDJSON se reescribe y el ghost
+    cambia de lugar no se sirve uno viejo.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._lru: "OrderedDict[Tuple[str, int, int], array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, index: GhostIndex, refid: str, ghost_id: int) -> Optional[array]:
+        loc = index.get(refid, ghost_id)
+        if loc is None:
+            return None
+        key = (refid, ghost_id, loc[0])
+        with self._lock:
+            steps = self._lru.get(key)
+            if steps is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return steps
+            self.misses += 1
+
+        steps = self._read(loc, refid, ghost_id)
+        if steps is None:
+            return None
+        with self._lock:
+            self._lru[key] = steps
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+        return steps
+
+    @staticmethod
+    def _read(loc: Tuple[int, int], refid: str, ghost_id: int) -> Optional[array]:
+        offset, length = loc
+        try:
+            with open(settings.NDJSON_PATH, "rb") as f:
+                f.seek(offset)
+                line = f.read(length)
+            obj = json.loads(line)
+        except (OSError, ValueError):
+            return None
+        # el archivo pudo reescribirse desde que se indexó: verificar que sea el mismo ghost
+        if not isinstance(obj, dict) or obj.get("__refid") != refid or obj.get("ghostId") != ghost_id:
+            return None
+        ghost = obj.get("ghost")
+        return decode_ghost(ghost) if isinstance(ghost, str) else None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._lru),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# instancia global
+ghost_store = GhostStore(settings.GHOST_CACHE_SIZE)
@@ -0,0 +1,147 @@
+# app/services/ingest.py
+from __future__ import annotations
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Tuple
+from app.loaders.ndjson_loader import iter_located, line_collection
+from app.loaders.unify import Unifier
+from app.services.ghosts import GhostIndex
+from app.services.latest_state import LatestCustomize, LatestProfiles
+from app.services.score_store import ScoreStore, StringTable, Json
+from app.services.standings import EventIndex, LeagueIndex
+
+# Colecciones del NDJSON que ingiere el cache
+INGEST_COLLECTIONS = ("score3", "hiscore3", "profile3", "customize3", "event3", "leagueresult3")
+
+
+class IngestState:
+    """
+    Estado compacto construido desde el NDJSON (lo que el cache mantiene como
+    builder). Es picklable: los workers de la carga en paralelo devuelven uno
+    por tramo y el proceso padre los une en orden con merge().
+    """
+
+    def __init__(self) -> None:
+        self.strings = StringTable()
+        self.scores = ScoreStore(self.strings)    # score3 (columnar)
+        self.hiscores = ScoreStore(self.strings)  # hiscore3 (columnar)
+        # Índices de perfiles para recuperar dancerName (gana la última línea)
+        self.profiles_by_refid: Dict[str, Json] = {}
+        self.profiles_by_pcbid: Dict[str, Json] = {}
+        # Último estado por jugador para /me (profile3 por refid/ddrCode/nombre, customize3 por refid)
+        self.latest_profiles = LatestProfiles()
+        self.customize = LatestCustomize()
+        # ghost3: solo (refid, ghostId) -> posición de la línea en el archivo
+        self.ghosts = GhostIndex()
+        # event3 / leagueresult3 ya ordenados para servir progreso y ligas
+        self.events = EventIndex()
+        self.leagues = LeagueIndex()
+        # mejor score3 por chart y dancer de /scores/unified (unify_records incremental)
+        self.unified = Unifier()
+
+    def ingest(self, lines: Iterable[bytes], offset: int = 0) -> None:
+        """
+        Parsea líneas y las agrega al estado.
+        Las líneas vienen con su salto de línea (splitlines(keepends=True)) y
+        `offset` es la posición de la primera en el archivo: así se indexa
+        cada ghost3 por byte sin decodificarlo y cada score3 unificado guarda
+        dónde releer su original.
+        Solo decodifica las colecciones que usamos (el resto se descarta
+        leyendo el prefijo, sin json.loads).
+        """
+        for obj, at in iter_located(self._tap_ghosts(lines, offset), INGEST_COLLECTIONS):
+            col = obj.get("collection")
+            if col == "score3":
+                self.scores.append(obj)
+                self.unified.add(obj, at)
+            elif col == "hiscore3":
+                self.hiscores.append(obj)
+            elif col == "profile3":
+                refid = obj.get("__refid") or obj.get("refid")
+                if isinstance(refid, str):
+                    self.profiles_by_refid[refid] = obj
+                pcbid = obj.get("pcbid")
+                if isinstance(pcbid, str):
+                    self.profiles_by_pcbid[pcbid] = obj
+                self.latest_profiles.add(obj)
+                self.unified.add(obj)
+            elif col == "customize3":
+                self.customize.add(obj)
+            elif col == "event3":
+                self.events.add(obj)
+            elif col == "leagueresult3":
+                self.leagues.add(obj)
+
+    def _tap_ghosts(self, lines: Iterable[bytes], offset: int) -> Iterator[Tuple[bytes, int]]:
+        """Indexa y saca del flujo las líneas ghost3; deja pasar el resto con su offset."""
+        pos = offset
+        for line in lines:
+            col = line_collection(line)
+            if col == b"ghost3" or (col is None and b'"ghost3"' in line):
+                self.ghosts.add(line.rstrip(b"\r\n"), pos)
+            else:
+                yield line, pos
+            pos += len(line)
+
+    def merge(self, other: "IngestState") -> None:
+        """Agrega el estado de un tramo posterior del archivo (mismo orden que secuencial)."""
+        self.scores.extend(other.scores)
+        self.hiscores.extend(other.hiscores)
+        # dict.update conserva "gana la última línea" entre tramos
+        self.profiles_by_refid.update(other.profiles_by_refid)
+        self.profiles_by_pcbid.update(other.profiles_by_pcbid)
+        self.latest_profiles.merge(other.latest_profiles)
+        self.customize.merge(other.customize)
+        self.ghosts.merge(other.ghosts)
+        self.events.merge(other.events)
+        self.leagues.merge(other.leagues)
+        self.unified.merge(other.unified)
+
+
+# ---------- carga en paralelo ----------
+def aligned_end(f, size: int) -> int:
+    """Offset justo después del último salto de línea completo del archivo."""
+    if size == 0:
+        return 0
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return mm.rfind(b"\n", 0, size) + 1
+
+
+def split_ranges(path: str, end: int, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """Divide [0, end) en tramos de ~chunk_bytes alineados a salto de línea."""
+    ranges: List[Tuple[int, int]] = []
+    if end <= 0:
+        return ranges
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < end:
+            stop = min(start + chunk_bytes, end)
+            if stop < end:
+                nl = mm.find(b"\n", stop - 1, end)
+                stop = end if nl == -1 else nl + 1
+            ranges.append((start, stop))
+            start = stop
+    return ranges
+
+
+def _parse_range(path: str, start: int, stop: int) -> IngestState:
+    """Worker: parsea un tramo [start, stop) del archivo a un IngestState."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:stop]
+    state = IngestState()
+    state.ingest(data.splitlines(keepends=True), start)
+    return state
+
+
+def load_parallel(path: str, end: int, workers: int, chunk_bytes: int) -> IngestState:
+    """
+    Carga en frío [0, end) repartiendo tramos en un pool de procesos.
+    El resultado es idéntico al de IngestState().ingest() secuencial.
+    """
+    ranges = split_ranges(path, end, chunk_bytes)
+    state = IngestState()
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        parts = ex.map(_parse_range, [path] * len(ranges), [a for a, _ in ranges], [b for _, b in ranges])
+        for part in parts:
+            state.merge(part)
+    return state
@@ -0,0 +1,135 @@
+# app/services/latest_state.py
+from __future__ import annotations
+from typing import Any, Dict, Optional, Tuple
+from app.services.score_store import Json
+
+Seq = Tuple[int, Json]   # (orden de llegada, documento)
+
+
+def _strip(v: Any) -> str:
+    return v.strip() if isinstance(v, str) else ""
+
+
+class LatestProfiles:
+    """
+    Último profile3 por __refid, ddrCode y dancerName, con su orden de
+    llegada. match() devuelve la ÚLTIMA línea que coincide por cualquiera
+    de los tres (prioridad de matching de /me) sin recorrer el archivo.
+    El builder lo modifica al ingerir; los snapshots reciben frozen().
+    """
+
+    def __init__(self) -> None:
+        self.seq = 0
+        self.by_refid: Dict[str, Seq] = {}
+        self.by_ddr_code: Dict[Any, Seq] = {}
+        self.by_name: Dict[str, Seq] = {}
+        self._frozen: Optional[LatestProfiles] = None   # última copia publicada
+
+    def add(self, obj: Json) -> None:
+        self.seq += 1
+        self._put(self.seq, obj)
+
+    def _put(self, seq: int, obj: Json) -> None:
+        self._frozen = None
+        entry = (seq, obj)
+        refid = _strip(obj.get("__refid"))
+        if refid:
+            self.by_refid[refid] = entry
+        ddr_code = obj.get("ddrCode")
+        if ddr_code is not None:
+            self.by_ddr_code[ddr_code] = entry
+        name = _strip(obj.get("dancerName"))
+        if name:
+            self.by_name[name] = entry
+
+    def merge(self, other: "LatestProfiles") -> None:
+        """Agrega un tramo posterior: sus órdenes van después de los nuestros."""
+        entries = {id(o): (s, o) for idx in (other.by_refid, other.by_ddr_code, other.by_name) for s, o in idx.values()}
+        for s, obj in sorted(entries.values(), key=lambda e: e[0]):
+            self._put(self.seq + s, obj)
+        self.seq += other.seq
+
+    def frozen(self) -> "LatestProfiles":
+        """Copia para el snapshot: se rehace solo si entró algún profile3 desde la anterior."""
+        if self._frozen is None:
+            copy = LatestProfiles()
+            copy.seq = self.seq
+            copy.by_refid, copy.by_ddr_code, copy.by_name = dict(self.by_refid), dict(self.by_ddr_code), dict(self.by_name)
+            copy._frozen = copy
+            self._frozen = copy
+        return self._frozen
+
+    def match(self, linked: Json) -> Optional[Json]:
+        """Último profile3 del jugador vinculado (por __refid, ddrCode o dancerName)."""
+        found = []
+        refid = _strip(linked.get("__refid"))
+        if refid and refid in self.by_refid:
+            found.append(self.by_refid[refid])
+        ddr_code = linked.get("ddrCode")
+        if ddr_code is not None and ddr_code in self.by_ddr_code:
+            found.append(self.by_ddr_code[ddr_code])
+        name = _strip(linked.get("dancerName"))
+        if name and name in self.by_name:
+            found.append(self.by_name[name])
+        return max(found, key=lambda e: e[0])[1] if found else None
+
+    def by_ref(self, refid: str) -> Optional[Json]:
+        entry = self.by_refid.get(_strip(refid))
+        return entry[1] if entry else None
+
+    # la copia publicada no va al sidecar ni a los workers de la carga en paralelo
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"seq": self.seq, "by_refid": self.by_refid, "by_ddr_code": self.by_ddr_code, "by_name": self.by_name}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._frozen = None
+
+
+class LatestCustomize:
+    """
+    Por __refid: {(category, pattern): key} de la última customize3 de cada
+    par. El dict de un jugador se reemplaza (no se modifica) en cada cambio,
+    así frozen() solo copia el nivel de afuera.
+    """
+
+    def __init__(self) -> None:
+        self.by_refid: Dict[str, Dict[Tuple[int, int], Any]] = {}
+        self._frozen: Optional[LatestCustomize] = None   # última copia publicada
+
+    def add(self, obj: Json) -> None:
+        refid = _strip(obj.get("__refid"))
+        if not refid:
+            return
+        try:
+            pair = (int(obj.get("category", -1)), int(obj.get("pattern", 0)))
+        except (TypeError, ValueError):
+            return
+        per = dict(self.by_refid.get(refid, {}))
+        per[pair] = obj.get("key", 0)
+        self.by_refid[refid] = per
+        self._frozen = None
+
+    def merge(self, other: "LatestCustomize") -> None:
+        for refid, pairs in other.by_refid.items():
+            self.by_refid[refid] = {**self.by_refid.get(refid, {}), **pairs}
+        self._frozen = None
+
+    def frozen(self) -> "LatestCustomize":
+        """Copia para el snapshot: se rehace solo si entró alguna customize3 desde la anterior."""
+        if self._frozen is None:
+            copy = LatestCustomize()
+            copy.by_refid = dict(self.by_refid)
+            copy._frozen = copy
+            self._frozen = copy
+        return self._frozen
+
+    def get(self, refid: str) -> Dict[Tuple[int, int], Any]:
+        return dict(self.by_refid.get(_strip(refid), {}))
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"by_refid": self.by_refid}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.by_refid = state["by_refid"]
+        self._frozen = None
@@ -0,0 +1,130 @@
+# app/services/leaderboard.py
+from __future__ import annotations
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+from app.services.score_store import NONE, ScoreView
+
+ANY_DIFFICULTY = -1   # board por modo (mejor del jugador en cualquier dificultad)
+
+BoardKey = Tuple[int, int, int]   # (songId, style 0=S/1=D, difficulty o ANY_DIFFICULTY)
+Entry = Tuple[int, int, int]      # (-score, primera fila del jugador en el board, dancer)
+# (key, dancer, posición antes, ahora, fila del nuevo mejor, fila del mejor anterior o NONE)
+Move = Tuple[BoardKey, int, Optional[int], Optional[int], int, int]
+
+
+def style_key(style: int) -> int:
+    # 0/None => Single, 1 => Double (igual que _mode_from_style)
+    return 1 if style == 1 else 0
+
+
+class Board:
+    """
+    Ranking de un chart: mejor score por jugador + orden de ranking.
+    Inmutable una vez publicado; updated() devuelve una copia modificada.
+    A igual score queda primero quien apareció antes en el board.
+    """
+
+    __slots__ = ("best", "order")
+
+    def __init__(self, best: Dict[int, Tuple[int, int, int]], order: List[Entry]) -> None:
+        self.best = best     # dancer -> (score, first_seen, fila)
+        self.order = order   # ordenado: mejor primero
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def top(self, n: int) -> List[Tuple[int, int]]:
+        """[(dancer, fila del mejor score)] de los n primeros."""
+        return [(d, self.best[d][2]) for _, _, d in self.order[:n]]
+
+    def position(self, dancer: int) -> Optional[int]:
+        """Posición (1-based) del jugador en el board, o None."""
+        b = self.best.get(dancer)
+        if b is None:
+            return None
+        return bisect_left(self.order, (-b[0], b[1], dancer)) + 1
+
+    def updated(self, plays: List[Tuple[int, int, int]]) -> "Board":
+        """
+        Aplica jugadas (dancer, score, fila) en orden de archivo. Cada mejora
+        mueve una sola entrada (bisect); solo este board se copia.
+        """
+        best = self.best
+        order = self.order
+        copied = False
+        for dancer, score, row in plays:
+            prev = best.get(dancer)
+            if prev is not None and score <= prev[0]:
+                continue
+            if not copied:
+                best, order, copied = dict(best), list(order), True
+            first_seen = row
+            if prev is not None:
+                first_seen = prev[1]
+                old = (-prev[0], prev[1], dancer)
+                del order[bisect_left(order, old)]
+            best[dancer] = (score, first_seen, row)
+            insort(order, (-score, first_seen, dancer))
+        return Board(best, order) if copied else self
+
+
+_EMPTY_BOARD = Board({}, [])
+
+
+class Leaderboards:
+    """
+    Índice (songId, modo, dificultad) -> Board para un ScoreView, mantenido
+    de forma incremental: extend() procesa solo las filas nuevas y reemplaza
+    (copy-on-write) los boards tocados, así los snapshots publicados no cambian.
+    """
+
+    def __init__(self) -> None:
+        self.boards: Dict[BoardKey, Board] = {}
+        self.rows = 0   # filas ya procesadas
+
+    def extend(self, view: ScoreView, track: bool = False) -> List[Move]:
+        """
+        Agrega las filas [rows, n) del view. Devuelve un Move por cada
+        jugador que mejoró su mejor score en un board (fila nueva y la que
+        reemplaza); con `track` también calcula las posiciones antes/después
+        (para el feed en vivo).
+        """
+        if view.n <= self.rows:
+            return []
+        pending: Dict[BoardKey, List[Tuple[int, int, int]]] = {}
+        cols = view.cols
+        songs, styles, diffs = cols["song_id"], cols["style"], cols["difficulty"]
+        scores, dancers = cols["score"], cols["dancer"]
+        for i in range(self.rows, view.n):
+            song = songs[i]
+            if song == NONE:
+                continue
+            sk = style_key(styles[i])
+            play = (dancers[i], max(scores[i], 0), i)
+            pending.setdefault((song, sk, ANY_DIFFICULTY), []).append(play)
+            if diffs[i] != NONE:
+                pending.setdefault((song, sk, diffs[i]), []).append(play)
+        self.rows = view.n
+
+        boards = dict(self.boards)
+        moves: List[Move] = []
+        for key, plays in pending.items():
+            old = boards.get(key, _EMPTY_BOARD)
+            new = old.updated(plays)
+            if new is old:
+                continue
+            boards[key] = new
+            for dancer in dict.fromkeys(p[0] for p in plays):
+                best = new.best[dancer]
+                prev = old.best.get(dancer)
+                if prev == best:
+                    continue
+                before = after = None
+                if track:
+                    before, after = old.position(dancer), new.position(dancer)
+                moves.append((key, dancer, before, after, best[2], NONE if prev is None else prev[2]))
+        self.boards = boards
+        return moves
+
+    def get(self, song: int, style: int, difficulty: int = ANY_DIFFICULTY) -> Board:
+        return self.boards.get((song, style, difficulty), _EMPTY_BOARD)
@@ -0,0 +1,160 @@
+# app/services/level_matrix.py
+from __future__ import annotations
+import threading
+from array import array
+from collections import OrderedDict
+from bisect import bisect_right
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from app.loaders.unify import GRADE_THRESHOLDS, GRADES
+from app.services.dancer_stats import CK_FC, CK_GFC, CK_MFC, CK_PFC
+from app.services.leaderboard import ANY_DIFFICULTY
+from app.services.snapshot import Snapshot
+
+Json = Dict[str, Any]
+ChartKey = Tuple[int, int, int]   # (songId, style 0/1, difficulty)
+
+MAX_LEVEL = 19
+
+# Lámparas "al menos": un MFC también cuenta como PFC, GFC y FC
+LAMPS = (("MFC", CK_MFC), ("PFC", CK_PFC), ("GFC", CK_GFC), ("FC", CK_FC))
+
+# Layout de los contadores por (style, level): [jugados, lámparas..., notas...]
+_PLAYED = 0
+_LAMP0 = 1
+_GRADE0 = _LAMP0 + len(LAMPS)
+_WIDTH = _GRADE0 + len(GRADES)
+
+# Umbrales ascendentes para bisect: score -> índice en GRADES
+_GRADE_MINS = [m for m, _ in reversed(GRADE_THRESHOLDS)]
+
+
+def chart_levels(songs_meta: Mapping[int, Json]) -> Dict[ChartKey, int]:
+    """Catálogo (songId, style, difficulty) -> nivel desde diffLv (0..4 Single, 5..9 Double)."""
+    out: Dict[ChartKey, int] = {}
+    for song, meta in songs_meta.items():
+        lv = meta.get("diffLv")
+        if not isinstance(lv, list):
+            continue
+        for idx, level in enumerate(lv[:10]):
+            if isinstance(level, int) and 1 <= level <= MAX_LEVEL:
+                out[(song, idx // 5, idx % 5)] = level
+    return out
+
+
+class LevelMatrix:
+    """
+    Matriz nivel x lámpara/nota de cada dancer para un snapshot y una fuente.
+
+    Une el catálogo de charts con el mejor score de cada dancer por chart
+    (tomado de los leaderboards por dificultad) y acumula por columnas:
+    primero junta (dancer, style, nivel, score, clearKind) en arrays y
+    después calcula notas y lámparas pasada por pasada.
+    """
+
+    def __init__(self, snap: Snapshot, source: str) -> None:
+        self.version = snap.version
+        view = snap.hiscores if source == "hiscore3" else snap.scores
+        boards = snap.hiscore_boards if source == "hiscore3" else snap.score_boards
+        levels = snap.chart_levels
+        self.view = view
+
+        # charts del catálogo por (style, nivel): denominador de los porcentajes
+        self.catalog: Dict[Tuple[int, int], int] = {}
+        for (_, style, _), level in levels.items():
+            self.catalog[(style, level)] = self.catalog.get((style, level), 0) + 1
+
+        # 1) mejores por chart como columnas
+        dancers, cells, rows = array("i"), array("i"), array("i")
+        for (song, style, diff), board in boards.items():
+            if diff == ANY_DIFFICULTY:
+                continue
+            level = levels.get((song, style, diff))
+            if level is None:
+                continue
+            cell = style * (MAX_LEVEL + 1) + level
+            for dancer, (_, _, row) in board.best.items():
+                dancers.append(dancer)
+                cells.append(cell)
+                rows.append(row)
+
+        # 2) notas y lámparas en una pasada por columna
+        score_col, kind_col = view.cols["score"], view.cols["clear_kind"]
+        scores = [max(score_col[r], 0) for r in rows]
+        grades = [len(GRADES) - bisect_right(_GRADE_MINS, s) for s in scores]
+        lamp_rank = {ck: k for k, (_, ck) in enumerate(LAMPS)}
+        lamps = [lamp_rank.get(kind_col[r], len(LAMPS)) for r in rows]
+
+        # 3) acumulación por (dancer, style, nivel)
+        self.by_dancer: Dict[int, Dict[int, array]] = {}
+        for d, cell, g, lamp in zip(dancers, cells, grades, lamps):
+            per = self.by_dancer.get(d)
+            if per is None:
+                per = self.by_dancer[d] = {}
+            c = per.get(cell)
+            if c is None:
+                c = per[cell] = array("i", bytes(4 * _WIDTH))
+            c[_PLAYED] += 1
+            c[_GRADE0 + g] += 1
+            for k in range(lamp, len(LAMPS)):   # "al menos": MFC suma en PFC/GFC/FC
+                c[_LAMP0 + k] += 1
+
+    def dancer(self, dancer: int, style: Optional[int] = None) -> List[Json]:
+        """Filas por nivel 1..19 (style None = Single + Double)."""
+        per = self.by_dancer.get(dancer, {})
+        styles = (0, 1) if style is None else (style,)
+        out: List[Json] = []
+        for level in range(1, MAX_LEVEL + 1):
+            total = array("i", bytes(4 * _WIDTH))
+            charts = 0
+            for st in styles:
+                charts += self.catalog.get((st, level), 0)
+                c = per.get(st * (MAX_LEVEL + 1) + level)
+                if c is not None:
+                    for k in range(_WIDTH):
+                        total[k] += c[k]
+            if not charts and not total[_PLAYED]:
+                continue
+            lamps = {name: total[_LAMP0 + k] for k, (name, _) in enumerate(LAMPS)}
+            grades = {g: total[_GRADE0 + k] for k, g in enumerate(GRADES)}
+            pct = lambda n: round(100.0 * n / charts, 1) if charts else None  # noqa: E731
+            out.append({
+                "level": level,
+                "charts": charts,
+                "played": total[_PLAYED],
+                "lamps": lamps,
+                "grades": grades,
+                "pct": {
+                    "played": pct(total[_PLAYED]),
+                    **{name: pct(n) for name, n in lamps.items()},
+                    "AAA": pct(grades["AAA"]),
+                },
+            })
+        return out
+
+
+# Matrices recientes por (versión, fuente): score3 y hiscore3 de la versión
+# actual y de la anterior conviven sin desplazarse entre sí
+MEMO_SIZE = 4
+_memo: "OrderedDict[Tuple[int, str], LevelMatrix]" = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def level_matrix(snap: Snapshot, source: str) -> LevelMatrix:
+    """
+    LevelMatrix del snapshot, calculada una vez por versión de datos y
+    fuente. Se arma fuera del lock: un cálculo largo no frena al resto.
+    """
+    key = (snap.version, source)
+    with _memo_lock:
+        m = _memo.get(key)
+        if m is not None:
+            _memo.move_to_end(key)
+            return m
+
+    m = LevelMatrix(snap, source)
+    with _memo_lock:
+        _memo[key] = m
+        _memo.move_to_end(key)
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+    return m
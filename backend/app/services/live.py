@@ -0,0 +1,166 @@
+# app/services/live.py
+from __future__ import annotations
+import asyncio
+import json
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.services.leaderboard import ANY_DIFFICULTY, Move
+from app.services.score_store import mode_from_style, score_row
+from app.services.snapshot import Snapshot
+
+Json = Dict[str, Any]
+
+# Eventos pendientes por cliente; si uno lento se llena se descartan los más viejos
+QUEUE_SIZE = 256
+
+# Tope de eventos por recarga: con más (p.ej. un import masivo) se manda un
+# solo "resync" para que el cliente vuelva a pedir los datos
+MAX_BATCH_EVENTS = 500
+
+
+class LiveEvent:
+    """Evento ya serializado + campos para filtrar por suscriptor."""
+
+    __slots__ = ("kind", "dancer", "song_id", "data")
+
+    def __init__(self, kind: str, payload: Json, dancer: Optional[str] = None, song_id: Optional[int] = None) -> None:
+        self.kind = kind
+        self.dancer = dancer
+        self.song_id = song_id
+        self.data = json.dumps({"type": kind, **payload}, ensure_ascii=False, separators=(",", ":"))
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, dancer: Optional[str], song_id: Optional[int]) -> None:
+        self.loop = loop
+        self.queue: "asyncio.Queue[LiveEvent]" = asyncio.Queue(QUEUE_SIZE)
+        self.dancer = dancer
+        self.song_id = song_id
+        self.dropped = 0
+
+    def wants(self, ev: LiveEvent) -> bool:
+        if ev.kind == "resync":   # a todos
+            return True
+        if self.dancer is not None and ev.dancer != self.dancer:
+            return False
+        if self.song_id is not None and ev.song_id != self.song_id:
+            return False
+        return True
+
+    def _offer(self, ev: LiveEvent) -> None:
+        # corre en el loop del suscriptor
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(ev)
+
+
+class LiveHub:
+    """
+    Difusión de plays nuevos a /live (WebSocket) y /live/sse.
+
+    El cache llama publish() desde el hilo que recargó (watcher); los eventos
+    se arman y serializan una sola vez y se entregan a la cola asyncio de
+    cada suscriptor con call_soon_threadsafe.
+    """
+
+    def __init__(self) -> None:
+        self._subs: List[Subscription] = []
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, dancer: Optional[str] = None, song_id: Optional[int] = None) -> Subscription:
+        sub = Subscription(asyncio.get_running_loop(), dancer, song_id)
+        with self._lock:
+            self._subs = self._subs + [sub]
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subs = [s for s in self._subs if s is not sub]
+
+    def has_subscribers(self) -> bool:
+        return bool(self._subs)
+
+    def publish(
+        self,
+        snap: Snapshot,
+        new_rows: Sequence[Tuple[int, int]],
+        moves: Sequence[Sequence[Move]],
+    ) -> None:
+        """
+        new_rows: rango (desde, hasta) de filas nuevas de (score3, hiscore3).
+        moves: cambios de posición en leaderboards de (score3, hiscore3).
+        """
+        if self._subs:
+            self._fan_out(self._build(snap, new_rows, moves))
+
+    def resync(self, snap: Snapshot) -> None:
+        """Los datos se reconstruyeron: los clientes deben volver a pedir todo."""
+        if self._subs:
+            self._fan_out([LiveEvent("resync", {"version": snap.version})])
+
+    def _fan_out(self, events: List[LiveEvent]) -> None:
+        self.published += len(events)
+        for sub in self._subs:
+            for ev in events:
+                if sub.wants(ev):
+                    try:
+                        sub.loop.call_soon_threadsafe(sub._offer, ev)
+                    except RuntimeError:   # loop cerrado: el cliente ya se fue
+                        break
+
+    def _build(
+        self,
+        snap: Snapshot,
+        new_rows: Sequence[Tuple[int, int]],
+        moves: Sequence[Sequence[Move]],
+    ) -> List[LiveEvent]:
+        total = sum(hi - lo for lo, hi in new_rows) + sum(len(m) for m in moves)
+        if total > MAX_BATCH_EVENTS:
+            return [LiveEvent("resync", {"version": snap.version})]
+
+        events: List[LiveEvent] = []
+        sources = (("score3", snap.scores), ("hiscore3", snap.hiscores))
+        for (source, view), (lo, hi), source_moves in zip(sources, new_rows, moves):
+            for i in range(lo, hi):
+                row = score_row(view, i, source, snap.songs_meta)
+                events.append(LiveEvent(
+                    "score",
+                    {"version": snap.version, "row": row},
+                    dancer=row["dancerName"],
+                    song_id=row["songId"],
+                ))
+            for (song, style, diff), _, before, after, i, _ in source_moves:
+                if before == after:
+                    continue
+                dancer = view.dancer_name(i) or "UNKNOWN"
+                events.append(LiveEvent(
+                    "position",
+                    {
+                        "version": snap.version,
+                        "source": source,
+                        "songId": song,
+                        "mode": mode_from_style(style),
+                        "difficulty": None if diff == ANY_DIFFICULTY else diff,
+                        "dancerName": dancer,
+                        "from": before,
+                        "to": after,
+                        "score": view.value("score", i) or 0,
+                    },
+                    dancer=dancer,
+                    song_id=song,
+                ))
+        return events
+
+    def stats(self) -> Json:
+        subs = self._subs
+        return {
+            "subscribers": len(subs),
+            "published": self.published,
+            "dropped": sum(s.dropped for s in subs),
+        }
+
+
+# instancia global
+live_hub = LiveHub()
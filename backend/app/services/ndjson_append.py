@@ -0,0 +1,140 @@
+# app/services/ndjson_append.py
+from __future__ import annotations
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from app.core.config import settings
+
+try:  # POSIX
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+RETRY_SEC = 0.005   # entre intentos de tomar el lock / ver el final del archivo
+
+
+def encode_lines(objs: Iterable[Dict[str, Any]]) -> bytes:
+    """Objetos -> bloque NDJSON (una línea compacta por objeto, como asphyxia)."""
+    return b"".join(
+        json.dumps(o, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        for o in objs
+    )
+
+
+class SavedataBusy(Exception):
+    """
+    No se pudo agregar ahora (otro escritor tiene el lock o dejó una línea a
+    medias): no se escribió nada y se puede reintentar. La API responde 503.
+    """
+
+
+@contextmanager
+def _locked(path: str) -> Iterator[None]:
+    """
+    Lock exclusivo sobre path + ".lock" mientras se escribe: ordena a
+    nuestros propios escritores (varios workers/procesos del backend).
+    Es un archivo aparte para no bloquear nunca bytes del savedata (en
+    Windows msvcrt.locking es obligatorio y NeDB no podría leerlo).
+    El servidor del juego no lo respeta; para él la garantía es O_APPEND.
+    Si no se consigue en NDJSON_LOCK_TIMEOUT_SEC lanza SavedataBusy.
+    """
+    fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        deadline = time.monotonic() + settings.NDJSON_LOCK_TIMEOUT_SEC
+        while not _try_lock(fd):
+            if time.monotonic() >= deadline:
+                raise SavedataBusy("lock del savedata ocupado")
+            time.sleep(RETRY_SEC)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:   # EWOULDBLOCK / EACCES: lo tiene otro
+        return False
+    return True
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def append_block(path: str, block: bytes, fsync: Optional[bool] = None) -> int:
+    """Como append_block_at; devuelve solo los bytes escritos."""
+    return append_block_at(path, block, fsync)[0]
+
+
+def append_block_at(path: str, block: bytes, fsync: Optional[bool] = None) -> Tuple[int, int]:
+    """
+    Agrega `block` (líneas completas) al final de path con O_APPEND, bajo
+    lock y en un solo write: el archivo nunca se reemplaza ni se copia, así
+    que el costo no depende de su tamaño.
+
+    Nunca escribe dentro de una línea ajena: si el archivo no termina en
+    salto de línea, el servidor del juego está a mitad de un registro (no
+    toma nuestro lock), así que se espera hasta NDJSON_TAIL_WAIT_SEC a que
+    lo termine; si no, SavedataBusy sin haber escrito nada. El final se mira
+    con el mismo fd justo antes del write; que el juego empiece una línea
+    entre esa lectura y el write no se puede excluir sin su cooperación.
+    fsync=None usa settings.NDJSON_FSYNC.
+    Devuelve (bytes escritos, offset del archivo donde termina el bloque).
+    """
+    if not block:
+        return 0, 0
+    if fsync is None:
+        fsync = settings.NDJSON_FSYNC
+    flags = os.O_RDWR | os.O_APPEND | getattr(os, "O_BINARY", 0)
+    with _locked(path):
+        fd = os.open(path, flags)
+        try:
+            _wait_line_end(fd)
+            view = memoryview(block)
+            while view:   # write puede ser parcial (disco lleno, señales)
+                n = os.write(fd, view)
+                view = view[n:]
+            end = os.lseek(fd, 0, os.SEEK_CUR)   # con O_APPEND: justo después de lo escrito
+            if fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+    return len(block), end
+
+
+def append_records(path: str, objs: Iterable[Dict[str, Any]], fsync: Optional[bool] = None) -> int:
+    """Serializa objs y los agrega en un solo bloque (ver append_block)."""
+    return append_block(path, encode_lines(objs), fsync)
+
+
+def _wait_line_end(fd: int) -> None:
+    """Espera (acotado) a que el savedata termine en salto de línea."""
+    deadline = time.monotonic() + settings.NDJSON_TAIL_WAIT_SEC
+    while not _ends_with_newline(fd):
+        if time.monotonic() >= deadline:
+            raise SavedataBusy("el savedata termina en una línea a medias")
+        time.sleep(RETRY_SEC)
+
+
+def _ends_with_newline(fd: int) -> bool:
+    # con O_APPEND la posición de lectura no afecta dónde escribe el write
+    size = os.fstat(fd).st_size
+    if size == 0:
+        return True
+    os.lseek(fd, size - 1, os.SEEK_SET)
+    return os.read(fd, 1) == b"\n"
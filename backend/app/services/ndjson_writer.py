@@ -1,7 +1,9 @@
 from __future__ import annotations
-import json, os, tempfile, shutil
-from typing import Any, Dict, Optional
+import os, tempfile, shutil
+from typing import Any, Dict, Optional, Tuple
 from app.core.config import settings
+from app.services.cache import cache
+from app.services.write_queue import write_queue
 
 PROFILE_COLLECTION = "profile3"
 
@@ -54,30 +56,24 @@ def _coerce_value(expected_type: type, value: Any) -> Any:
     return value
 
 
-def _match_profile(obj: Dict[str, Any], linked: Dict[str, Any]) -> bool:
-    """Coincide contra la línea si corresponde al mismo jugador vinculado."""
-    if obj.get("collection") != PROFILE_COLLECTION:
-        return False
-
-    # Prioridad de matching: __refid > ddrCode > dancerName
-    refid = (linked.get("__refid") or "").strip()
-    if refid and (obj.get("__refid") or "").strip() == refid:
-        return True
-
-    ddr_code = linked.get("ddrCode")
-    if ddr_code is not None and obj.get("ddrCode") == ddr_code:
-        return True
-
-    name = (linked.get("dancerName") or "").strip()
-    if name and (obj.get("dancerName") or "").strip() == name:
-        return True
-
-    return False
+def update_profile3_fields(linked: Dict[str, Any], patch: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    APPEND-ONLY: arma la nueva línea profile3 (ver build_profile3_line) y la
+    escribe por la cola de escritura. Devuelve el snapshot de lo que quedó.
+    """
+    built = build_profile3_line(linked, patch)
+    if built is None:
+        return None
+    line, updated_snapshot = built
+    write_queue.append([line])
+    return updated_snapshot
 
 
-def update_profile3_fields(linked: Dict[str, Any], patch: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+def build_profile3_line(
+    linked: Dict[str, Any], patch: Dict[str, Any]
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
     """
-    APPEND-ONLY:
+    Nueva línea profile3 (sin escribirla) + snapshot:
       - Toma la ÚLTIMA coincidencia profile3 del usuario como base (si existe).
       - Aplica solo campos CORE permitidos (ver ALLOWED_KEYS) y purga customize.
       - CREA una NUEVA línea profile3 con _id + createdAt/updatedAt actuales.
@@ -101,19 +97,8 @@ def update_profile3_fields(linked: Dict[str, Any], patch: Dict[str, Any]) -> Opt
     if not normalized:
         return None
 
-    # 1) buscar ÚLTIMA coincidencia como base
-    last_obj = None
-    with open(path, "r", encoding="utf-8") as rf:
-        for line in rf:
-            s = line.strip()
-            if not s:
-                continue
-            try:
-                obj = json.loads(s)
-            except Exception:
-                continue
-            if _match_profile(obj, linked):
-                last_obj = obj
+    # 1) ÚLTIMA coincidencia como base (índice del cache, ver LatestProfiles)
+    last_obj = cache.latest_profile(linked)
 
     # 2) construir objeto base para la nueva línea
     from collections import OrderedDict
@@ -153,16 +138,12 @@ def update_profile3_fields(linked: Dict[str, Any], patch: Dict[str, Any]) -> Opt
     base["createdAt"] = {"$$date": now_ms}
     base["updatedAt"] = {"$$date": now_ms}
 
-    # 3) apendear como nueva línea (sin tocar lo anterior)
-    with open(path, "a", encoding="utf-8") as wf:
-        wf.write(json.dumps(base, ensure_ascii=False, separators=(",", ":")) + "\n")
-
-    # 4) snapshot de lo relevante
+    # 3) snapshot de lo relevante (la línea se apendea sin tocar lo anterior)
     updated_snapshot: Dict[str, Any] = {k: base.get(k) for k in ALLOWED_KEYS.keys()}
     updated_snapshot["dancerName"] = base.get("dancerName")
     updated_snapshot["__refid"] = base.get("__refid")
     updated_snapshot["ddrCode"] = base.get("ddrCode")
-    return updated_snapshot
+    return base, updated_snapshot
 
 
 
@@ -174,27 +155,11 @@ def read_profile3_fields(linked: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     if not os.path.exists(path):
         return None
 
-    last_obj = None
-    with open(path, "r", encoding="utf-8") as rf:
-        for line in rf:
-            s = line.strip()
-            if not s:
-                continue
-            try:
-                obj = json.loads(s)
-            except Exception:
-                continue
-            if _match_profile(obj, linked):
-                last_obj = obj
-
+    last_obj = cache.latest_profile(linked)
     if not last_obj:
         return None
 
-    # purgar customize solo para el snapshot (por prolijidad)
-    for bad in list(CUSTOM_KEYS):
-        if bad in last_obj:
-            last_obj.pop(bad, None)
-
+    # el objeto es del cache: el snapshot solo toma campos core (sin customize)
     snap = {k: last_obj.get(k) for k in ALLOWED_KEYS.keys()}
     snap["dancerName"] = last_obj.get("dancerName")
     snap["__refid"] = last_obj.get("__refid")
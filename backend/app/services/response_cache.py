@@ -0,0 +1,144 @@
+# app/services/response_cache.py
+from __future__ import annotations
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from app.core.config import settings
+
+try:  # brotli es opcional: si no está instalado solo se ofrece gzip
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover
+    brotli = None
+
+Json = Dict[str, Any]
+
+# Debajo de esto no vale la pena comprimir
+MIN_COMPRESS_BYTES = 1024
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def pick_encoding(accept_encoding: str) -> Optional[str]:
+    """br si el cliente lo acepta y está brotli; si no gzip; si no nada."""
+    accepted = {p.split(";")[0].strip().lower() for p in accept_encoding.split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class CachedResponse:
+    """Respuesta ya serializada (JSON en bytes) + variantes comprimidas."""
+
+    __slots__ = ("body", "headers", "media_type", "variants")
+
+    def __init__(self, body: bytes, headers: Dict[str, str], media_type: str) -> None:
+        self.body = body
+        self.headers = headers          # headers propios del endpoint (X-Total-Count, ...)
+        self.media_type = media_type
+        self.variants: Dict[str, bytes] = {}   # "gzip" / "br" -> bytes
+
+    def size(self) -> int:
+        return len(self.body) + sum(len(v) for v in self.variants.values())
+
+
+class ResponseCache:
+    """
+    Cache LRU de respuestas serializadas, clave (ruta, query normalizada,
+    versión de datos), con tope de memoria en bytes. Al aparecer una versión
+    nueva se descartan las entradas de versiones viejas (ya no se pueden pedir);
+    una respuesta de una versión anterior a la vigente no se guarda.
+    """
+
+    def __init__(self, budget_bytes: int) -> None:
+        self.budget = budget_bytes
+        self._lru: "OrderedDict[Hashable, Tuple[Any, CachedResponse]]" = OrderedDict()
+        self._bytes = 0
+        self._versions: Dict[str, int] = {}   # kind -> versión más nueva vista (solo avanza)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            item = self._lru.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._lru.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: Hashable, kind: str, version: int, entry: CachedResponse) -> None:
+        if entry.size() > self.budget:
+            return
+        with self._lock:
+            current = self._versions.get(kind)
+            if current is not None and version < current:
+                return   # request lento sobre un snapshot viejo: no pisa lo nuevo
+            if current != version:
+                self._versions[kind] = version
+                for k in [k for k, (kd, _) in self._lru.items() if kd == kind]:
+                    self._drop(k)
+            old = self._lru.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1].size()
+            self._lru[key] = (kind, entry)
+            self._bytes += entry.size()
+            self._shrink()
+
+    def body_for(
+        self, key: Hashable, entry: CachedResponse, encoding: Optional[str]
+    ) -> Tuple[bytes, Optional[str]]:
+        """Cuerpo para el Accept-Encoding dado; comprime una vez y lo guarda."""
+        if encoding is None or len(entry.body) < MIN_COMPRESS_BYTES:
+            return entry.body, None
+        data = entry.variants.get(encoding)
+        if data is None:
+            data = _compress(entry.body, encoding)
+            with self._lock:
+                if encoding not in entry.variants:
+                    entry.variants[encoding] = data
+                    cur = self._lru.get(key)
+                    if cur is not None and cur[1] is entry:   # sigue en cache: cuenta en el tope
+                        self._bytes += len(data)
+                        self._shrink()
+        return data, encoding
+
+    def _drop(self, key: Hashable) -> None:
+        _, entry = self._lru.pop(key)
+        self._bytes -= entry.size()
+
+    def _shrink(self) -> None:
+        while self._bytes > self.budget and self._lru:
+            self._drop(next(iter(self._lru)))
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            self._bytes = 0
+
+    def stats(self) -> Json:
+        with self._lock:
+            return {
+                "entries": len(self._lru),
+                "bytes": self._bytes,
+                "budget_bytes": self.budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "brotli": brotli is not None,
+            }
+
+
+# instancia global
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MB * 1024 * 1024)
@@ -0,0 +1,199 @@
+# app/services/score_index.py
+from __future__ import annotations
+import heapq
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from app.services.score_store import NONE, ScoreView
+
+# Órdenes soportados por /scores (descendente; a igual valor, orden de archivo)
+SORTS = ("score", "exScore", "date")
+
+# clave de orden de una fila: (-valor, fila)
+SortKey = Tuple[int, int]
+
+
+def _value_fn(view: ScoreView, sort: str) -> Callable[[int], int]:
+    cols = view.cols
+    if sort == "date":
+        upd, cre = cols["updated_at"], cols["created_at"]
+        return lambda i: upd[i] if upd[i] != NONE else cre[i]
+    col = cols["ex_score"] if sort == "exScore" else cols["score"]
+    return lambda i: col[i] if col[i] > 0 else 0   # score ausente cuenta como 0
+
+
+def encode_cursor(key: SortKey) -> str:
+    return f"{-key[0]}:{key[1]}"
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    """Inversa de encode_cursor; ValueError si el cursor no es válido."""
+    value, row = cursor.split(":")
+    return (-int(value), int(row))
+
+
+class ScoreIndex:
+    """
+    Índices secundarios de un ScoreStore para /scores:
+
+    - by_dancer / by_song: filas (ascendentes, append-only) por id de
+      dancer y por songId; se acotan al n del snapshot con bisect.
+    - order(sort): todas las filas ordenadas por score / exScore / fecha,
+      calculado a demanda una vez por versión (las filas nuevas se ordenan
+      y se mezclan con el orden anterior).
+
+    Si un renombre en profile3 reescribe la columna dancer, el cache arma
+    un ScoreIndex nuevo; los snapshots viejos conservan el suyo.
+    """
+
+    def __init__(self) -> None:
+        self.by_dancer: Dict[int, array] = {}
+        self.by_song: Dict[int, array] = {}
+        self.rows = 0   # filas ya indexadas
+        self._orders: Dict[str, Tuple[int, array]] = {}   # sort -> (n, filas ordenadas)
+
+    def extend(self, view: ScoreView) -> None:
+        cols = view.cols
+        dancers, songs = cols["dancer"], cols["song_id"]
+        for i in range(self.rows, view.n):
+            for idx, key in ((self.by_dancer, dancers[i]), (self.by_song, songs[i])):
+                rows = idx.get(key)
+                if rows is None:
+                    rows = idx[key] = array("i")
+                rows.append(i)
+        self.rows = max(self.rows, view.n)
+
+    @staticmethod
+    def bounded(rows: Optional[array], n: int) -> array:
+        """Filas del índice visibles para un snapshot de n registros."""
+        if rows is None:
+            return array("i")
+        return rows[: bisect_left(rows, n)]
+
+    def order(self, view: ScoreView, sort: str) -> array:
+        """Filas [0, n) del view ordenadas por `sort` (mejor primero)."""
+        value = _value_fn(view, sort)
+        key = lambda i: (-value(i), i)  # noqa: E731
+        n = view.n
+        memo = self._orders.get(sort)
+        if memo is not None and memo[0] == n:
+            return memo[1]
+        if memo is not None and memo[0] < n:
+            fresh = sorted(range(memo[0], n), key=key)
+            out = array("i", heapq.merge(memo[1], fresh, key=key))
+        else:
+            out = array("i", sorted(range(n), key=key))
+        if memo is None or memo[0] < n:
+            self._orders[sort] = (n, out)
+        return out
+
+    def query(
+        self,
+        view: ScoreView,
+        limit: int,
+        sort: str = "score",
+        cursor: Optional[SortKey] = None,
+        dancer: Optional[int] = None,
+        song: Optional[int] = None,
+        style: Optional[int] = None,
+        difficulty: Optional[int] = None,
+        clear_kind: Optional[int] = None,
+    ) -> Tuple[List[int], Optional[str]]:
+        """
+        Top `limit` filas que pasan los filtros, estrictamente después de
+        `cursor` en el orden pedido. Devuelve (filas, cursor siguiente o None).
+
+        Con filtro de dancer o canción se parte de la lista más chica del
+        índice y se elige el top con un heap; sin ellos se recorre el orden
+        precalculado desde la posición del cursor (bisect).
+        """
+        value = _value_fn(view, sort)
+        key = lambda i: (-value(i), i)  # noqa: E731
+        candidates, ok = self._plan(view, dancer, song, style, difficulty, clear_kind)
+
+        if candidates is not None:
+            pool = [i for i in candidates if ok(i) and (cursor is None or key(i) > cursor)]
+            picked = heapq.nsmallest(limit + 1, pool, key=key)
+        else:
+            order = self.order(view, sort)
+            start = 0
+            if cursor is not None:
+                lo, hi = 0, len(order)
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if key(order[mid]) <= cursor:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                start = lo
+            picked = []
+            for pos in range(start, len(order)):
+                i = order[pos]
+                if ok(i):
+                    picked.append(i)
+                    if len(picked) > limit:
+                        break
+
+        if len(picked) > limit:
+            picked = picked[:limit]
+            return picked, encode_cursor(key(picked[-1]))
+        return picked, None
+
+    def scan(
+        self,
+        view: ScoreView,
+        sort: str = "score",
+        dancer: Optional[int] = None,
+        song: Optional[int] = None,
+        style: Optional[int] = None,
+        difficulty: Optional[int] = None,
+        clear_kind: Optional[int] = None,
+    ) -> Iterator[int]:
+        """Todas las filas que pasan los filtros, en orden (generador: para exportar)."""
+        value = _value_fn(view, sort)
+        candidates, ok = self._plan(view, dancer, song, style, difficulty, clear_kind)
+        if candidates is not None:
+            yield from sorted((i for i in candidates if ok(i)), key=lambda i: (-value(i), i))
+            return
+        for i in self.order(view, sort):
+            if ok(i):
+                yield i
+
+    def _plan(
+        self,
+        view: ScoreView,
+        dancer: Optional[int],
+        song: Optional[int],
+        style: Optional[int],
+        difficulty: Optional[int],
+        clear_kind: Optional[int],
+    ) -> Tuple[Optional[array], Callable[[int], bool]]:
+        """(filas candidatas desde el índice o None = todas, chequeo del resto de filtros)."""
+        cols = view.cols
+        checks: List[Tuple[array, int]] = []
+        if difficulty is not None:
+            checks.append((cols["difficulty"], difficulty))
+        if clear_kind is not None:
+            checks.append((cols["clear_kind"], clear_kind))
+        styles = cols["style"]
+
+        # parte de la lista más chica del índice; las demás pasan a ser chequeos
+        indexed = [
+            (self.bounded(idx.get(want), view.n), col, want)
+            for col, idx, want in (("dancer", self.by_dancer, dancer), ("song_id", self.by_song, song))
+            if want is not None
+        ]
+        indexed.sort(key=lambda t: len(t[0]))
+        candidates = indexed[0][0] if indexed else None
+        checks.extend((cols[col], want) for _, col, want in indexed[1:])
+
+        def ok(i: int) -> bool:
+            # style: 0/None => Single, 1 => Double
+            if style is not None and (1 if styles[i] == 1 else 0) != style:
+                return False
+            for c, w in checks:
+                if c[i] != w:
+                    return False
+            return True
+
+        return candidates, ok
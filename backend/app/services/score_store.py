@@ -0,0 +1,211 @@
+# app/services/score_store.py
+from __future__ import annotations
+from array import array
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+Json = Dict[str, Any]
+
+# Valor centinela para "campo ausente" en las columnas numéricas
+NONE = -1
+
+# (columna, typecode de array, campo en el NDJSON)
+# 'b' = int8, 'i' = int32, 'q' = int64 (timestamps en ms)
+COLUMNS: Tuple[Tuple[str, str, str], ...] = (
+    ("song_id",    "i", "songId"),
+    ("style",      "b", "style"),
+    ("difficulty", "b", "difficulty"),
+    ("score",      "i", "score"),
+    ("ex_score",   "i", "exScore"),
+    ("clear_kind", "b", "clearKind"),
+    ("rank",       "b", "rank"),
+    ("max_combo",  "i", "maxCombo"),
+    ("ghost_id",   "i", "ghostId"),
+    ("created_at", "q", "createdAt"),
+    ("updated_at", "q", "updatedAt"),
+)
+
+# Columnas de strings internados (ids en StringTable)
+STRING_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("name",  "dancerName"),   # dancerName que trae el propio registro
+    ("refid", "__refid"),
+    ("pcbid", "pcbid"),
+)
+
+_LIMITS = {"b": (-128, 127), "i": (-(2 ** 31), 2 ** 31 - 1), "q": (-(2 ** 63), 2 ** 63 - 1)}
+
+
+def _to_int(v: Any, typecode: str) -> int:
+    """Convierte a int para la columna; NONE si falta, no es numérico o no cabe."""
+    if isinstance(v, dict):          # {"$$date": ms}
+        v = v.get("$$date")
+    if v is None or isinstance(v, bool):
+        return NONE
+    try:
+        n = int(v)
+    except Exception:
+        return NONE
+    lo, hi = _LIMITS[typecode]
+    return n if lo <= n <= hi else NONE
+
+
+class StringTable:
+    """Tabla de strings internados (append-only): str <-> id entero."""
+
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def intern(self, s: Any) -> int:
+        if not isinstance(s, str):
+            return NONE
+        s = s.strip()
+        if not s:
+            return NONE
+        i = self._ids.get(s)
+        if i is None:
+            i = len(self.values)
+            self._ids[s] = i
+            self.values.append(s)
+        return i
+
+    def lookup(self, s: str) -> int:
+        """Id de un string ya internado, o NONE (no lo agrega)."""
+        return self._ids.get(s.strip(), NONE) if isinstance(s, str) else NONE
+
+    def get(self, i: int) -> Optional[str]:
+        return self.values[i] if 0 <= i < len(self.values) else None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class ScoreStore:
+    """
+    Almacén columnar append-only para score3/hiscore3: un array tipado por
+    campo en vez de un dict por registro. Solo guarda lo que servimos
+    (se descartan customerCode, companyCode, __s, _id, etc.).
+    """
+
+    def __init__(self, strings: StringTable) -> None:
+        self.strings = strings
+        self.cols: Dict[str, array] = {name: array(tc) for name, tc, _ in COLUMNS}
+        for name, _ in STRING_COLUMNS:
+            self.cols[name] = array("i")
+
+    def __len__(self) -> int:
+        return len(self.cols["song_id"])
+
+    def append(self, doc: Json) -> int:
+        """Agrega un documento score3/hiscore3; devuelve su índice."""
+        for name, tc, key in COLUMNS:
+            self.cols[name].append(_to_int(doc.get(key), tc))
+        self.cols["name"].append(self.strings.intern(doc.get("dancerName")))
+        self.cols["refid"].append(self.strings.intern(doc.get("__refid") or doc.get("refid")))
+        self.cols["pcbid"].append(self.strings.intern(doc.get("pcbid")))
+        return len(self) - 1
+
+    def extend(self, other: "ScoreStore") -> None:
+        """Agrega todos los registros de otro store (remapeando sus strings)."""
+        remap = [self.strings.intern(s) for s in other.strings.values]
+        for name, _, _ in COLUMNS:
+            self.cols[name].extend(other.cols[name])
+        for name, _ in STRING_COLUMNS:
+            self.cols[name].extend(array("i", [NONE if x == NONE else remap[x] for x in other.cols[name]]))
+
+    def view(self, **derived: array) -> "ScoreView":
+        """Vista acotada al largo actual; `derived` agrega columnas calculadas (p.ej. dancer)."""
+        cols = {**self.cols, **derived} if derived else self.cols
+        return ScoreView(cols, self.strings, len(self))
+
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in self.cols.values())
+
+
+class ScoreView:
+    """
+    Vista inmutable de un ScoreStore acotada a los primeros n registros.
+    Los arrays son append-only, así que lo que está bajo n nunca cambia
+    aunque el builder siga agregando registros.
+    """
+
+    __slots__ = ("cols", "strings", "n")
+
+    def __init__(self, cols: Dict[str, array], strings: StringTable, n: int) -> None:
+        self.cols = cols
+        self.strings = strings
+        self.n = n
+
+    def __len__(self) -> int:
+        return self.n
+
+    def col(self, name: str) -> array:
+        """Copia de la columna acotada a n (un memcpy; apta para escaneos)."""
+        return self.cols[name][: self.n]
+
+    def value(self, name: str, i: int) -> Optional[int]:
+        v = self.cols[name][i]
+        return None if v == NONE else v
+
+    def dancer_name(self, i: int) -> Optional[str]:
+        """dancerName ya resuelto al ingerir (columna derivada "dancer")."""
+        nid = self.cols["dancer"][i]
+        return None if nid == NONE else self.strings.values[nid]
+
+    def record(self, i: int) -> Json:
+        """Campos del registro i con los nombres del NDJSON (None si faltan)."""
+        v = self.value
+        return {
+            "songId": v("song_id", i),
+            "style": v("style", i),
+            "difficulty": v("difficulty", i),
+            "score": v("score", i),
+            "clearKind": v("clear_kind", i),
+            "exScore": v("ex_score", i),
+            "maxCombo": v("max_combo", i),
+            "rank": v("rank", i),
+            "createdAt": date_json(v("created_at", i)),
+            "updatedAt": date_json(v("updated_at", i)),
+        }
+
+    def where(self, name: str, value: int) -> List[int]:
+        """Índices cuyo valor en la columna es igual a value."""
+        return [i for i, v in enumerate(self.col(name)) if v == value]
+
+    def iter_rows(self) -> Iterator[int]:
+        return iter(range(self.n))
+
+    @staticmethod
+    def empty() -> "ScoreView":
+        return ScoreStore(StringTable()).view(dancer=array("i"))
+
+
+def mode_from_style(style: Optional[int]) -> str:
+    # 0/None => Single, 1 => Double
+    return "D" if style == 1 else "S"
+
+
+def score_row(view: ScoreView, i: int, source: str, songs_meta: Mapping[int, Json]) -> Json:
+    """Fila tal como la sirve /scores (también el export y el feed en vivo)."""
+    rec = view.record(i)
+    song_id = rec["songId"]
+    return {
+        "source": source,
+        "songId": song_id,
+        "style": rec["style"],
+        "mode": mode_from_style(rec["style"]),
+        "difficulty": rec["difficulty"],
+        "dancerName": view.dancer_name(i) or "UNKNOWN",
+        "score": rec["score"],
+        "clearKind": rec["clearKind"],
+        "exScore": rec["exScore"],
+        "maxCombo": rec["maxCombo"],
+        "rank": rec["rank"],
+        "createdAt": rec["createdAt"],
+        "updatedAt": rec["updatedAt"],
+        "songMeta": songs_meta.get(song_id),   # instancia compartida por canción
+    }
+
+
+def date_json(ms: Optional[int]) -> Optional[Json]:
+    """Vuelve a la forma {"$$date": ms} que trae el NDJSON (la usa el frontend)."""
+    return None if ms is None else {"$$date": ms}
@@ -0,0 +1,141 @@
+# app/services/search.py
+from __future__ import annotations
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+Json = Dict[str, Any]
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Similitud mínima (trigramas) para aceptar un resultado difuso
+FUZZY_MIN = 0.3
+
+
+def fold(text: Any) -> str:
+    """Normaliza para buscar: NFKD, sin acentos y casefold ("Señorita" -> "senorita")."""
+    if text is None:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchEntry:
+    __slots__ = ("kind", "id", "label", "key", "data")
+
+    def __init__(self, kind: str, id: Any, label: str, data: Optional[Json]) -> None:
+        self.kind = kind          # "song" | "dancer"
+        self.id = id
+        self.label = label
+        self.key = fold(label)    # label normalizado (para exacto / empieza con)
+        self.data = data          # documento original (songs.json) si aplica
+
+
+class SearchIndex:
+    """
+    Índice de búsqueda de canciones y bailarines, construido una vez por carga
+    del catálogo (o cuando aparece un nombre nuevo) y de solo lectura después.
+
+    - Prefijo: lista ordenada de (token, entrada) + bisect.
+    - Difuso: índice invertido de trigramas con similitud de Jaccard.
+    """
+
+    def __init__(self, songs: Iterable[Tuple[Any, Json]] = (), dancers: Iterable[str] = ()) -> None:
+        self.entries: List[SearchEntry] = []
+        self._tokens: List[Tuple[str, int]] = []
+        self._trigrams: Dict[str, List[int]] = {}
+        self._tri_count: List[int] = []
+
+        for mcode, song in songs:
+            title = song.get("name") or song.get("title") or str(mcode)
+            text = " ".join(str(x) for x in (title, song.get("artist"), song.get("basename")) if x)
+            self._add("song", mcode, str(title), text, song)
+        for name in sorted(set(dancers)):
+            self._add("dancer", name, name, name, None)
+
+        self._tokens.sort()
+        # catálogo ordenado por nombre para listados sin query
+        self.songs_sorted: List[SearchEntry] = sorted(
+            (e for e in self.entries if e.kind == "song"), key=lambda e: e.label
+        )
+
+    def _add(self, kind: str, id: Any, label: str, text: str, data: Optional[Json]) -> None:
+        idx = len(self.entries)
+        folded = fold(text)
+        self.entries.append(SearchEntry(kind, id, label, data))
+        for tok in set(_TOKEN_RE.findall(folded)):
+            self._tokens.append((tok, idx))
+        tris = trigrams(folded)
+        self._tri_count.append(len(tris))
+        for tri in tris:
+            self._trigrams.setdefault(tri, []).append(idx)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # ---------- consultas ----------
+    def _prefix(self, token: str) -> Set[int]:
+        out: Set[int] = set()
+        i = bisect_left(self._tokens, (token, -1))
+        toks = self._tokens
+        while i < len(toks) and toks[i][0].startswith(token):
+            out.add(toks[i][1])
+            i += 1
+        return out
+
+    def search(self, q: str, kind: Optional[str] = None) -> List[Tuple[SearchEntry, float]]:
+        """
+        Devuelve (entrada, puntaje) ordenado de mejor a peor:
+        coincidencia exacta > todas las palabras por prefijo > difuso por trigramas.
+        """
+        fq = fold(q).strip()
+        qtokens = _TOKEN_RE.findall(fq)
+        if not qtokens:
+            return []
+
+        scored: Dict[int, float] = {}
+
+        # 1) todas las palabras de la query como prefijo de algún token
+        hits: Optional[Set[int]] = None
+        for tok in qtokens:
+            ids = self._prefix(tok)
+            hits = ids if hits is None else hits & ids
+            if not hits:
+                break
+        for idx in hits or ():
+            label = self.entries[idx].key
+            if label == fq:
+                s = 3.0
+            elif label.startswith(fq):
+                s = 2.5
+            else:
+                s = 2.0
+            scored[idx] = s - len(label) / 1000.0   # a igual tier, los más cortos primero
+
+        # 2) difuso (errores de tipeo, palabras pegadas); con 1-2 letras no aporta
+        if len(fq) >= 3:
+            qtri = trigrams(fq)
+            counts: Dict[int, int] = {}
+            for tri in qtri:
+                for idx in self._trigrams.get(tri, ()):
+                    counts[idx] = counts.get(idx, 0) + 1
+            for idx, shared in counts.items():
+                if idx in scored:
+                    continue
+                sim = shared / (len(qtri) + self._tri_count[idx] - shared)
+                if sim >= FUZZY_MIN:
+                    scored[idx] = sim
+
+        results = [
+            (self.entries[idx], round(s, 4))
+            for idx, s in scored.items()
+            if kind is None or self.entries[idx].kind == kind
+        ]
+        results.sort(key=lambda r: (-r[1], r[0].label))
+        return results
@@ -0,0 +1,44 @@
+# app/services/sidecar.py
+from __future__ import annotations
+import os
+import pickle
+import struct
+from typing import Any, Dict, Optional
+from app.core.config import settings
+
+# Archivo binario junto al NDJSON con los índices ya construidos:
+#   MAGIC | versión (uint16 LE) | pickle del payload
+# Es un archivo local que escribe el propio backend (no aceptar uno ajeno).
+MAGIC = b"DDRIDX\0"
+VERSION = 9   # subir cuando cambie la forma de IngestState o del payload
+
+_HEADER = struct.Struct("<H")
+
+
+def sidecar_path() -> str:
+    return settings.INDEX_SIDECAR_PATH or settings.NDJSON_PATH + ".idx"
+
+
+def save(path: str, payload: Dict[str, Any]) -> None:
+    """Escribe el sidecar de forma atómica (tmp + replace)."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER.pack(VERSION))
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load(path: str) -> Optional[Dict[str, Any]]:
+    """Lee el sidecar; None si no existe, es de otra versión o está corrupto."""
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            (version,) = _HEADER.unpack(f.read(_HEADER.size))
+            if version != VERSION:
+                return None
+            payload = pickle.load(f)
+    except (OSError, EOFError, struct.error, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+    return payload if isinstance(payload, dict) else None
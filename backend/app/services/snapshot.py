@@ -0,0 +1,72 @@
+# app/services/snapshot.py
+from __future__ import annotations
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple, Union
+from app.loaders.unify import Unifier
+from app.services.activity import ActivityView
+from app.services.ghosts import GhostIndex
+from app.services.latest_state import LatestCustomize, LatestProfiles
+from app.services.leaderboard import Board, BoardKey
+from app.services.score_index import ScoreIndex
+from app.services.score_store import ScoreView
+from app.services.search import SearchIndex
+
+Json = Dict[str, Any]
+Key = Union[int, str]
+
+_EMPTY: Mapping[Any, Any] = MappingProxyType({})
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    Estado inmutable del cache en un instante. El cache publica uno nuevo por
+    recarga (swap de una sola referencia), así un request que toma un snapshot
+    nunca mezcla scores viejos con perfiles nuevos.
+
+    Los mappings son copias o estructuras copy-on-write (boards); events,
+    leagues, ghosts, la actividad, unified y el último estado por jugador
+    son copias congeladas al publicar.
+    Se comparten con el builder:
+    - score_index / hiscore_index: listas append-only, se leen acotadas al
+      n de su ScoreView (ScoreIndex.bounded / order).
+    - search: se reemplaza entero cuando cambia, nunca se modifica.
+    """
+    version: int = 0
+    songs_version: int = 0   # cambia solo cuando se recarga songs.json
+    scores: ScoreView = field(default_factory=ScoreView.empty)      # score3
+    hiscores: ScoreView = field(default_factory=ScoreView.empty)    # hiscore3
+    profiles_by_refid: Mapping[str, Json] = field(default_factory=lambda: _EMPTY)
+    profiles_by_pcbid: Mapping[str, Json] = field(default_factory=lambda: _EMPTY)
+    songs_by_mcode: Mapping[Key, Json] = field(default_factory=lambda: _EMPTY)
+    songs_meta: Mapping[int, Json] = field(default_factory=lambda: _EMPTY)  # songMeta servida, compartida por filas
+    chart_levels: Mapping[Tuple[int, int, int], int] = field(default_factory=lambda: _EMPTY)  # (songId, style, diff) -> nivel
+    score_boards: Mapping[BoardKey, Board] = field(default_factory=lambda: _EMPTY)     # top por chart (score3)
+    hiscore_boards: Mapping[BoardKey, Board] = field(default_factory=lambda: _EMPTY)   # top por chart (hiscore3)
+    score_index: ScoreIndex = field(default_factory=ScoreIndex)     # filas por dancer / canción (score3)
+    hiscore_index: ScoreIndex = field(default_factory=ScoreIndex)   # filas por dancer / canción (hiscore3)
+    score_stats: Mapping[int, Tuple[int, ...]] = field(default_factory=lambda: _EMPTY)     # dancer -> contadores (score3)
+    hiscore_stats: Mapping[int, Tuple[int, ...]] = field(default_factory=lambda: _EMPTY)   # dancer -> contadores (hiscore3)
+    score_activity: ActivityView = field(default_factory=ActivityView)     # plays por hora/día/semana (score3)
+    hiscore_activity: ActivityView = field(default_factory=ActivityView)   # plays por hora/día/semana (hiscore3)
+    ghosts: GhostIndex = field(default_factory=GhostIndex)     # (refid, ghostId) -> posición en el NDJSON
+    events_by_refid: Mapping[str, Tuple[Json, ...]] = field(default_factory=lambda: _EMPTY)   # event3 por jugador (por eventId)
+    events_by_id: Mapping[int, Tuple[Json, ...]] = field(default_factory=lambda: _EMPTY)      # event3 por evento (compTime desc)
+    leagues: Mapping[int, Tuple[Json, ...]] = field(default_factory=lambda: _EMPTY)           # leagueresult3 por período (por clase)
+    leagues_by_refid: Mapping[str, Tuple[Json, ...]] = field(default_factory=lambda: _EMPTY)
+    unified: Unifier = field(default_factory=Unifier)          # mejor score3 por chart y dancer (/scores/unified)
+    latest_profiles: LatestProfiles = field(default_factory=LatestProfiles)   # último profile3 por jugador (/me, /auth)
+    customize: LatestCustomize = field(default_factory=LatestCustomize)       # última customize3 por jugador y par
+    ndjson_offset: int = 0       # bytes del NDJSON ya ingeridos en este snapshot
+    ndjson_generation: int = 0   # reconstrucción desde el byte 0 a la que pertenece ndjson_offset
+    search: SearchIndex = field(default_factory=SearchIndex)   # canciones + bailarines
+
+    def song_meta(self, song_id: Key) -> Optional[Json]:
+        """Metadata del songs.json para el mcode/songId dado (acepta int o str)."""
+        if song_id in self.songs_by_mcode:
+            return self.songs_by_mcode[song_id]
+        try:
+            return self.songs_by_mcode[int(song_id)]  # type: ignore[arg-type]
+        except Exception:
+            return self.songs_by_mcode.get(str(song_id))
@@ -0,0 +1,169 @@
+# app/services/standings.py
+from __future__ import annotations
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from app.services.score_store import Json, NONE, _to_int
+
+# Campos de event3 / leagueresult3 que se sirven (el resto del documento no se guarda)
+EVENT_FIELDS = (("eventId", "eventId"), ("eventNo", "eventNo"), ("eventType", "eventType"),
+                ("compTime", "compTime"), ("saveData", "saveData"))
+LEAGUE_FIELDS = (("leagueId", "id"), ("class", "class"), ("promoteRank", "promoteRank"),
+                 ("promoteScore", "promoteScore"), ("demoteRank", "demoteRank"),
+                 ("demoteScore", "demoteScore"), ("joinNum", "joinNum"))
+
+
+def _project(doc: Json, fields) -> Json:
+    out: Json = {}
+    for name, src in fields:
+        v = _to_int(doc.get(src), "q")
+        out[name] = None if v == NONE else v
+    out["updatedAt"] = _ms(doc.get("updatedAt")) or _ms(doc.get("createdAt"))
+    return out
+
+
+def _ms(v: Any) -> Optional[int]:
+    n = _to_int(v, "q")
+    return None if n == NONE else n
+
+
+class Groups:
+    """
+    Grupos de entradas ordenadas por sort_key, una entrada por ident(entry)
+    dentro de cada grupo. put() reemplaza en su lugar una lista mutable
+    (bisect/insort: O(log k) comparaciones por línea); frozen() publica una
+    tupla por grupo y solo copia los que cambiaron desde la anterior.
+    """
+
+    def __init__(self, sort_key: Callable[[Json], Any]) -> None:
+        self.sort_key = sort_key
+        self._keys: Dict[Any, List[Any]] = {}      # grupo -> claves ordenadas
+        self._items: Dict[Any, List[Json]] = {}    # grupo -> entradas, mismo orden
+        self._dirty: Set[Any] = set()
+        self._frozen: Dict[Any, Tuple[Json, ...]] = {}
+
+    def put(self, group: Any, entry: Json, old: Optional[Json] = None) -> None:
+        """Agrega entry; `old` es la entrada que reemplaza (misma identidad), si había."""
+        keys = self._keys.get(group)
+        if keys is None:
+            keys, items = self._keys[group], self._items[group] = [], []
+        else:
+            items = self._items[group]
+        if old is not None:
+            k = self.sort_key(old)
+            i = bisect_left(keys, k)
+            while items[i] is not old:   # claves repetidas: se busca la misma entrada
+                i += 1
+            del keys[i]
+            del items[i]
+        k = self.sort_key(entry)
+        i = bisect_right(keys, k)
+        keys.insert(i, k)
+        items.insert(i, entry)
+        self._dirty.add(group)
+
+    def frozen(self) -> Dict[Any, Tuple[Json, ...]]:
+        """Grupo -> tupla ordenada para el snapshot (el mismo dict si no hubo cambios)."""
+        if self._dirty:
+            out = dict(self._frozen)
+            for group in self._dirty:
+                out[group] = tuple(self._items[group])
+            self._frozen = out
+            self._dirty = set()
+        return self._frozen
+
+    def get(self, group: Any) -> Tuple[Json, ...]:
+        return tuple(self._items.get(group, ()))
+
+    # las tuplas publicadas no se persisten (sidecar, workers de la carga en paralelo)
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"sort_key": self.sort_key, "_keys": self._keys, "_items": self._items}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._dirty = set(self._items)
+        self._frozen = {}
+
+
+class EventIndex:
+    """
+    Progreso de eventos (event3), gana la última línea por (refid, eventId):
+    - by_refid: refid -> eventos del jugador ordenados por eventId.
+    - by_event: eventId -> jugadores ordenados por compTime desc (y quién llegó primero).
+    Cada línea nueva actualiza solo los dos grupos que toca.
+    """
+
+    def __init__(self) -> None:
+        self.by_refid = Groups(_event_in_refid)
+        self.by_event = Groups(_event_rank)
+        self._entries: Dict[Tuple[str, int], Json] = {}
+
+    def add(self, doc: Json) -> None:
+        refid = doc.get("__refid") or doc.get("refid")
+        entry = _project(doc, EVENT_FIELDS)
+        if not isinstance(refid, str) or entry["eventId"] is None:
+            return
+        entry["refid"] = refid
+        self._put(entry)
+
+    def _put(self, entry: Json) -> None:
+        key = (entry["refid"], entry["eventId"])
+        old = self._entries.get(key)
+        self._entries[key] = entry
+        self.by_refid.put(entry["refid"], entry, old)
+        self.by_event.put(entry["eventId"], entry, old)
+
+    def merge(self, other: "EventIndex") -> None:
+        for entry in other._entries.values():
+            self._put(entry)
+
+
+class LeagueIndex:
+    """
+    Resultados de liga (leagueresult3) por período (id) y clase, gana la
+    última línea. by_league: leagueId -> clases ordenadas (umbrales de
+    ascenso/descenso, participantes, si terminó). Si la línea trae
+    __refid se guarda también por jugador en by_refid.
+    """
+
+    def __init__(self) -> None:
+        self.by_league = Groups(_league_class)
+        self.by_refid = Groups(_league_in_refid)
+        self._entries: Dict[Tuple[int, int, Optional[str]], Json] = {}
+
+    def add(self, doc: Json) -> None:
+        entry = _project(doc, LEAGUE_FIELDS)
+        if entry["leagueId"] is None:
+            return
+        refid = doc.get("__refid")
+        entry["refid"] = refid if isinstance(refid, str) else None
+        entry["ended"] = bool(doc.get("ended"))
+        self._put(entry)
+
+    def _put(self, entry: Json) -> None:
+        key = (entry["leagueId"], entry["class"], entry["refid"])
+        old = self._entries.get(key)
+        self._entries[key] = entry
+        self.by_league.put(entry["leagueId"], entry, old)
+        if entry["refid"] is not None:
+            self.by_refid.put(entry["refid"], entry, old)
+
+    def merge(self, other: "LeagueIndex") -> None:
+        for entry in other._entries.values():
+            self._put(entry)
+
+
+# Órdenes de cada grupo (funciones de módulo: los índices van al sidecar con pickle)
+def _event_in_refid(e: Json) -> Any:
+    return (e["eventId"], e["eventNo"] or 0)
+
+
+def _event_rank(e: Json) -> Any:
+    return (-(e["compTime"] or 0), e["updatedAt"] or 0, e["refid"])
+
+
+def _league_class(e: Json) -> Any:
+    return (e["class"] if e["class"] is not None else NONE, e["refid"] or "")
+
+
+def _league_in_refid(e: Json) -> Any:
+    return (-e["leagueId"], e["class"] if e["class"] is not None else NONE)
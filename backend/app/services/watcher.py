@@ -0,0 +1,105 @@
+# app/services/watcher.py
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import settings
+from app.services.cache import Cache, cache
+
+Sig = Optional[Tuple[int, int, int]]
+
+
+class CacheWatcher:
+    """
+    Hilo en segundo plano que vigila NDJSON_PATH y SONGS_DICT_PATH y recarga
+    el cache cuando cambian, así los endpoints solo leen el estado actual.
+
+    Debounce: tras detectar un cambio espera WATCH_DEBOUNCE_SEC sin nuevas
+    escrituras (o como máximo WATCH_MAX_DELAY_SEC) antes de recargar.
+    """
+
+    def __init__(self, target: Cache) -> None:
+        self.cache = target
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.pending_since: Optional[float] = None   # epoch del primer cambio sin aplicar
+        self.last_error: Optional[str] = None
+
+    # ---------- ciclo de vida ----------
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        stale = (time.time() - self.pending_since) if self.pending_since else 0.0
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "pending_since": self.pending_since,
+            "stale_seconds": round(stale, 3),
+            "last_error": self.last_error,
+        }
+
+    # ---------- loop ----------
+    def _signature(self) -> Tuple[Sig, Sig]:
+        return _stat_sig(settings.NDJSON_PATH), _stat_sig(settings.SONGS_DICT_PATH)
+
+    def _run(self) -> None:
+        # firma primero y después una pasada: lo agregado entre el arranque del
+        # cache (warm_start, save_sidecar) y este punto se ingiere ya, y lo
+        # posterior cambia la firma
+        last = self._signature()
+        self._reload()
+        first_change: Optional[float] = None
+        last_change = 0.0
+
+        while not self._stop.wait(settings.WATCH_INTERVAL_SEC):
+            now = time.monotonic()
+            sig = self._signature()
+            if sig != last:
+                last = sig
+                last_change = now
+                if first_change is None:
+                    first_change = now
+                    self.pending_since = time.time()
+
+            if first_change is None:
+                continue
+
+            quiet = now - last_change >= settings.WATCH_DEBOUNCE_SEC
+            overdue = now - first_change >= settings.WATCH_MAX_DELAY_SEC
+            if not (quiet or overdue):
+                continue
+
+            self._reload()
+            first_change = None
+            self.pending_since = None
+
+    def _reload(self) -> None:
+        try:
+            self.cache.load_if_changed()
+            self.last_error = None
+        except Exception as e:  # el watcher no debe morir por un archivo a medias
+            self.last_error = repr(e)
+            print(">>> cache watcher error:", self.last_error)
+
+
+def _stat_sig(path: str) -> Sig:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+# instancia global
+watcher = CacheWatcher(cache)
@@ -0,0 +1,185 @@
+# app/services/write_queue.py
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+from app.core.config import settings
+from app.services.cache import cache
+from app.services.ndjson_append import SavedataBusy, append_block_at, encode_lines
+
+# Pedido encolado: (líneas serializadas, objetos, perf_counter al encolar, future del que espera)
+Pending = Tuple[bytes, List[Dict[str, Any]], float, Future]
+
+# Latencias recientes que se guardan para los percentiles de /stats/cache
+LATENCY_WINDOW = 1024
+
+
+class WriteQueue:
+    """
+    Escritor único de las líneas que agrega el backend al NDJSON
+    (profile3 / customize3), con group commit.
+
+    Cada request encola sus líneas ya serializadas y espera; el hilo escritor
+    junta todo lo pendiente en un solo bloque, lo escribe con un write bajo
+    lock y un fsync (ver append_block) y recién ahí confirma a cada uno.
+    Con muchos guardados a la vez se hace una escritura por tanda y no una
+    por request, y las líneas de distintos requests nunca se mezclan.
+
+    La tanda entera es un solo bloque: si el servidor del juego dejó una
+    línea a medias, append_block espera a que la termine y, si no, la tanda
+    falla con SavedataBusy (503 para cada request, nada escrito) en vez de
+    partir su registro o anteponer una línea vacía a la de cada uno.
+    """
+
+    def __init__(
+        self,
+        max_batch_bytes: int,
+        on_written: Optional[Callable[[List[Dict[str, Any]], int], None]] = None,
+    ) -> None:
+        self.max_batch_bytes = max_batch_bytes
+        self.on_written = on_written   # (objetos ya escritos, offset del final del bloque), antes de confirmar
+        self._pending: Deque[Pending] = deque()
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+
+        # Métricas (se exponen en /stats/cache)
+        self.batches = 0
+        self.requests = 0   # llamadas a append confirmadas
+        self.records = 0
+        self.bytes = 0
+        self.max_batch = 0
+        self.errors = 0
+        self.busy = 0   # tandas rechazadas con SavedataBusy (se pueden reintentar)
+        self.last_error: Optional[str] = None
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)   # ms, encolado -> confirmado
+        self._write_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)    # ms de cada write+fsync
+
+    # ---------- ciclo de vida ----------
+    def start(self) -> None:
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name="ndjson-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Termina el hilo después de escribir lo que quede pendiente."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread:
+            thread.join(timeout=5)
+        with self._cond:
+            self._thread = None
+
+    # ---------- API ----------
+    def append(self, objs: Iterable[Dict[str, Any]], timeout: Optional[float] = None) -> int:
+        """
+        Agrega objs al NDJSON y bloquea hasta que estén escritos (y con fsync
+        si NDJSON_FSYNC). Las líneas de una llamada van juntas y en orden.
+        Devuelve los bytes escritos; relanza el error de la escritura.
+        """
+        objs = list(objs)
+        if not objs:
+            return 0
+        block = encode_lines(objs)
+        fut: Future = Future()
+        with self._cond:   # Condition usa RLock: start() puede tomarlo de nuevo
+            if not (self._thread and self._thread.is_alive()):
+                self.start()   # uso fuera de la app (scripts): arranque perezoso
+            self._pending.append((block, objs, time.perf_counter(), fut))
+            self._cond.notify()
+        return fut.result(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            lat = sorted(self._latencies)
+            wr = sorted(self._write_ms)
+            return {
+                "running": bool(self._thread and self._thread.is_alive()),
+                "pending": len(self._pending),
+                "batches": self.batches,
+                "requests": self.requests,
+                "records": self.records,
+                "bytes": self.bytes,
+                "avg_batch": round(self.records / self.batches, 2) if self.batches else 0.0,
+                "avg_requests_per_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "max_batch": self.max_batch,
+                "latency_ms": _percentiles(lat),
+                "write_ms": _percentiles(wr),
+                "errors": self.errors,
+                "busy": self.busy,
+                "last_error": self.last_error,
+            }
+
+    # ---------- hilo escritor ----------
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._stop:
+                    self._cond.wait()
+                if not self._pending and self._stop:
+                    return
+                batch = self._take()
+            self._write(batch)
+
+    def _take(self) -> List[Pending]:
+        """Todo lo pendiente hasta max_batch_bytes (al menos un pedido)."""
+        batch = [self._pending.popleft()]
+        size = len(batch[0][0])
+        while self._pending and size + len(self._pending[0][0]) <= self.max_batch_bytes:
+            item = self._pending.popleft()
+            size += len(item[0])
+            batch.append(item)
+        return batch
+
+    def _write(self, batch: List[Pending]) -> None:
+        t0 = time.perf_counter()
+        try:
+            written, end = append_block_at(settings.NDJSON_PATH, b"".join(b for b, _, _, _ in batch))
+        except Exception as e:
+            with self._cond:
+                if isinstance(e, SavedataBusy):
+                    self.busy += 1
+                else:
+                    self.errors += 1
+                self.last_error = repr(e)
+            for _, _, _, fut in batch:
+                fut.set_exception(e)
+            return
+
+        if self.on_written is not None:
+            try:
+                self.on_written([o for _, objs, _, _ in batch for o in objs], end)
+            except Exception as e:   # lo escrito ya está en el archivo: el watcher lo toma igual
+                with self._cond:
+                    self.last_error = repr(e)
+
+        done = time.perf_counter()
+        n = sum(len(objs) for _, objs, _, _ in batch)
+        with self._cond:
+            self.batches += 1
+            self.requests += len(batch)
+            self.records += n
+            self.bytes += written
+            self.max_batch = max(self.max_batch, n)
+            self._write_ms.append((done - t0) * 1000)
+            self._latencies.extend((done - t) * 1000 for _, _, t, _ in batch)
+        for _, _, _, fut in batch:
+            fut.set_result(written)
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    pick = lambda q: round(values[min(len(values) - 1, int(q * len(values)))], 3)  # noqa: E731
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(values[-1], 3)}
+
+
+# instancia global
+write_queue = WriteQueue(settings.WRITE_BATCH_MAX_BYTES, on_written=cache.note_appended)
@@ -0,0 +1,85 @@
+"""
+Benchmark: guardar customize3 reescribiendo el savedata vs. O_APPEND.
+
+Uso (desde backend/):
+    python -m bench.bench_append [ruta_ndjson] [guardados]
+
+Copia el NDJSON a un directorio temporal agrandado 1x, 10x y 100x (líneas
+repetidas) y mide cuánto tarda un guardado de 10 customize3 con cada
+método. Con append el tiempo no debería crecer con el tamaño del archivo.
+"""
+from __future__ import annotations
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from app.core.config import settings
+from app.services.ndjson_append import append_records, encode_lines
+
+SIZES = (1, 10, 100)
+
+
+def batch(n: int = 10) -> List[Dict]:
+    now = int(time.time() * 1000)
+    return [
+        {
+            "collection": "customize3", "category": 2, "pattern": 1, "__s": "plugins_profile",
+            "__refid": "BENCH", "key": i + 1, "_id": f"bench{i:011d}",
+            "createdAt": {"$$date": now}, "updatedAt": {"$$date": now},
+        }
+        for i in range(n)
+    ]
+
+
+def rewrite_append(path: str, objs: List[Dict]) -> None:
+    """Lo que hacía update_customize: leer todo, copiarlo a un temporal y reemplazar."""
+    with open(path, "r", encoding="utf-8") as rf:
+        lines = rf.readlines()
+    with tempfile.NamedTemporaryFile("w", delete=False, encoding="utf-8", dir=os.path.dirname(path)) as wf:
+        tmp_path = wf.name
+        for line in lines:
+            wf.write(line)
+        wf.write(encode_lines(objs).decode("utf-8"))
+    shutil.move(tmp_path, path)
+
+
+def o_append(path: str, objs: List[Dict]) -> None:
+    append_records(path, objs, fsync=False)
+
+
+def per_save(fn: Callable[[str, List[Dict]], None], path: str, saves: int) -> float:
+    objs = batch()
+    t0 = time.perf_counter()
+    for _ in range(saves):
+        fn(path, objs)
+    return (time.perf_counter() - t0) / saves
+
+
+def main() -> None:
+    src = sys.argv[1] if len(sys.argv) > 1 else settings.NDJSON_PATH
+    saves = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with open(src, "rb") as f:
+        data = f.read()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for reps in SIZES:
+            results = {}
+            for label, fn in (("reescritura", rewrite_append), ("O_APPEND", o_append)):
+                path = os.path.join(tmp, f"{reps}x.db")
+                with open(path, "wb") as f:
+                    f.write(data * reps)
+                results[label] = per_save(fn, path, saves)
+            mb = len(data) * reps / 1e6
+            print(
+                f"{reps:4d}x ({mb:8.1f} MB)  reescritura={results['reescritura'] * 1000:8.2f} ms/guardado"
+                f"  O_APPEND={results['O_APPEND'] * 1000:6.3f} ms/guardado"
+                f"  x{results['reescritura'] / results['O_APPEND']:7.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: prefiltro por colección vs. json.loads de todas las líneas.
+
+Uso (desde backend/):
+    python -m bench.bench_prefilter [ruta_ndjson] [repeticiones]
+
+Por defecto usa settings.NDJSON_PATH. Las líneas se repiten en memoria
+`repeticiones` veces para simular un savedata más grande con la misma forma.
+"""
+from __future__ import annotations
+import json
+import sys
+import time
+from collections import Counter
+from typing import Callable, Collection, List
+
+from app.core.config import settings
+from app.loaders.ndjson_loader import iter_collections, line_collection
+
+# Suscripciones reales de los loaders
+CASES = {
+    "cache (score3/hiscore3/profile3)": ("score3", "hiscore3", "profile3"),
+    "read_customize (customize3)": ("customize3",),
+    "profile3 (writer/auth)": ("profile3",),
+}
+
+
+def full_parse(lines: List[bytes], wanted: Collection[str]) -> int:
+    """Lo que hacían los loaders: json.loads de todo y filtrar después."""
+    n = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+        except Exception:
+            continue
+        if obj.get("collection") in wanted:
+            n += 1
+    return n
+
+
+def prefiltered(lines: List[bytes], wanted: Collection[str]) -> int:
+    return sum(1 for _ in iter_collections(lines, wanted))
+
+
+def best_of(fn: Callable[[], int], rounds: int = 5) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    path = sys.argv[1] if len(sys.argv) > 1 else settings.NDJSON_PATH
+    reps = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    with open(path, "rb") as f:
+        lines = f.readlines() * reps
+
+    shape = Counter()
+    for line in lines:
+        col = line_collection(line.strip())
+        shape[col.decode() if col else "(otro)"] += 1
+    print(f"{path}: {len(lines)} líneas ({reps}x) -> {dict(shape.most_common())}")
+
+    for label, wanted in CASES.items():
+        assert full_parse(lines, wanted) == prefiltered(lines, wanted)
+        t_full = best_of(lambda: full_parse(lines, wanted))
+        t_fast = best_of(lambda: prefiltered(lines, wanted))
+        print(f"{label:36s} full={t_full * 1000:8.1f} ms  prefiltro={t_fast * 1000:8.1f} ms  x{t_full / t_fast:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Stress de la cola de escritura (group commit) con muchos escritores a la vez.
+
+Uso (desde backend/):
+    python -m bench.stress_write_queue [hilos] [guardados_por_hilo] [lineas_por_guardado] [lineas_externas]
+
+Trabaja sobre una copia temporal de settings.NDJSON_PATH (o un archivo vacío
+si no existe). Cada hilo agrega customize3 numeradas por la cola y, a la
+vez, un escritor externo (como el servidor del juego) agrega score3 en
+dos write separados, dejando la línea a medias un rato y terminándola sin
+nuestro lock. Solo el comienzo de cada línea va bajo el lock: que el juego
+empiece una línea justo entre nuestra lectura del final y el write no se
+puede excluir sin su cooperación, y el bench tiene que ser determinista.
+Los guardados rechazados con SavedataBusy se reintentan, como haría el
+cliente con el 503. Al final se verifica que:
+  - todas las líneas nuevas son JSON válido (nada intercalado ni cortado,
+    ninguna línea vacía),
+  - están todas las nuestras y todas las externas, sin duplicados,
+  - las de un mismo guardado quedaron contiguas y cada hilo en su orden.
+Imprime las métricas de latencia y tamaño de tanda de la cola.
+"""
+from __future__ import annotations
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from app.core.config import settings
+from app.services.ndjson_append import SavedataBusy, _locked
+from app.services.write_queue import WriteQueue
+
+HALF_LINE_SEC = 0.02   # cuánto deja el escritor externo su línea a medias
+
+
+def record(writer: int, save: int, line: int) -> Dict:
+    return {
+        "collection": "customize3", "category": 2, "pattern": 1, "__s": "plugins_profile",
+        "__refid": f"STRESS{writer:04d}", "key": line + 1,
+        "_id": f"w{writer}-s{save}-l{line}",
+        "stress": [writer, save, line],
+    }
+
+
+def main() -> None:
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    saves = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    per_save = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    external = int(sys.argv[4]) if len(sys.argv) > 4 else 50
+
+    src = settings.NDJSON_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "stress.db")
+        if os.path.exists(src):
+            shutil.copy(src, path)
+        else:
+            open(path, "wb").close()
+        if not _ends_with_newline(path):
+            with open(path, "ab") as f:   # la copia es nuestra: se parte de líneas completas
+                f.write(b"\n")
+        start_size = os.path.getsize(path)
+        settings.NDJSON_PATH = path   # la cola escribe donde apunta settings
+
+        queue = WriteQueue(settings.WRITE_BATCH_MAX_BYTES)
+        queue.start()
+        barrier = threading.Barrier(threads)
+        errors: List[BaseException] = []
+        retries = [0]
+
+        def writer(w: int) -> None:
+            barrier.wait()
+            try:
+                for s in range(saves):
+                    while True:
+                        try:
+                            queue.append(record(w, s, i) for i in range(per_save))
+                            break
+                        except SavedataBusy:
+                            retries[0] += 1
+            except BaseException as e:   # se reporta al final
+                errors.append(e)
+
+        def game(stop: threading.Event) -> None:
+            """Escritor externo: O_APPEND, cada línea en dos write y la segunda mitad sin lock."""
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | getattr(os, "O_BINARY", 0))
+            try:
+                for k in range(external):
+                    if stop.is_set():
+                        break
+                    line = json.dumps({"collection": "score3", "external": k}).encode("utf-8") + b"\n"
+                    cut = len(line) // 2
+                    with _locked(path):
+                        os.write(fd, line[:cut])
+                    time.sleep(HALF_LINE_SEC)   # nuestros escritores ven la línea a medias
+                    os.write(fd, line[cut:])
+                    time.sleep(HALF_LINE_SEC)
+            finally:
+                os.close(fd)
+
+        t0 = time.perf_counter()
+        pool = [threading.Thread(target=writer, args=(w,)) for w in range(threads)]
+        stop = threading.Event()
+        outside = threading.Thread(target=game, args=(stop,))
+        outside.start()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        outside.join()
+        queue.stop()
+        settings.NDJSON_PATH = src
+
+        # ---- verificación ----
+        with open(path, "rb") as f:
+            f.seek(start_size)
+            tail = f.read()
+        lines = tail.split(b"\n")
+        if lines and lines[-1] == b"":
+            lines.pop()
+        seen: Dict[Tuple[int, int, int], int] = {}
+        ours: List[bytes] = []
+        outer: Dict[int, int] = {}
+        last_save: Dict[int, int] = {}
+        bad = 0
+        for raw in lines:
+            try:
+                obj = json.loads(raw)
+            except Exception:
+                bad += 1   # línea cortada, intercalada o vacía
+                continue
+            if "external" in obj:
+                outer[obj["external"]] = outer.get(obj["external"], 0) + 1
+                continue
+            pos = len(ours)
+            ours.append(raw)
+            w, s, i = obj["stress"]
+            if (w, s, i) in seen:
+                bad += 1
+            seen[(w, s, i)] = pos
+            if i == 0:
+                if s <= last_save.get(w, -1):
+                    bad += 1   # un hilo quedó fuera de orden
+                last_save[w] = s
+        # las líneas de un guardado van juntas
+        for (w, s, i), pos in seen.items():
+            if i and seen.get((w, s, i - 1)) != pos - 1:
+                bad += 1
+
+        expected = threads * saves * per_save
+        stats = queue.stats()
+        print(f"{threads} hilos x {saves} guardados x {per_save} líneas = {expected} líneas en {elapsed:.2f}s")
+        print(f"escritas={len(ours)} únicas={len(seen)} problemas={bad} errores={len(errors)}")
+        print(f"externas={len(outer)}/{external} duplicadas={sum(n > 1 for n in outer.values())} "
+              f"reintentos={retries[0]} tandas rechazadas={stats['busy']}")
+        print(f"tandas={stats['batches']} pedidos/tanda={stats['avg_requests_per_batch']} "
+              f"líneas/tanda={stats['avg_batch']} (máx {stats['max_batch']})")
+        print(f"latencia ms={stats['latency_ms']} write ms={stats['write_ms']}")
+        ok = (not errors and bad == 0 and len(seen) == expected == len(ours)
+              and len(outer) == external and all(n == 1 for n in outer.values()))
+        print("OK" if ok else "FALLÓ")
+        if not ok:
+            sys.exit(1)
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+if __name__ == "__main__":
+    main()
@@ -29,7 +29,8 @@ export type ScoreRow = {
 
 export type DancerSummaryRow = {
   dancerName: string;
-  total: number;
+  total: number;   // registros jugados
+  charts: number;  // charts distintos; AAA y lámparas cuentan el mejor score de cada uno
   AAA: number;
   FC: number;
   GFC: number;
@@ -59,6 +60,19 @@ export type SongRankingResponse = {
   double: SongRankingItem[];
 };
 
+export type SongRankingsItem = {
+  songId: number | string;
+  difficulty: number | null;
+  single?: SongRankingItem[];
+  double?: SongRankingItem[];
+};
+
+export type SongRankingsResponse = {
+  source: "score3" | "hiscore3";
+  songMeta: Record<string, SongRankingResponse["songMeta"]>;
+  rankings: SongRankingsItem[];
+};
+
 // ===== API base =====
 export const API = axios.create({
   baseURL: import.meta.env.VITE_API_URL || "http://localhost:8000",
@@ -69,24 +83,55 @@ export const API = axios.create({
 // ===== Endpoints =====
 
 // Scores list
-export async function fetchScores(
-  opts: { limit?: number; dancer?: string; source?: "score3" | "hiscore3" } = {}
-): Promise<ScoreRow[]> {
-  const { limit = 50, dancer, source = "score3" } = opts;
-  const { data } = await API.get("/scores", {
-    params: { limit, dancer, source },
+export type ScoresQuery = {
+  limit?: number;
+  dancer?: string;
+  source?: "score3" | "hiscore3";
+  songId?: number;
+  mode?: "S" | "D";
+  difficulty?: number;
+  clearKind?: number;
+  sort?: "score" | "exScore" | "date";
+  cursor?: string;
+};
+
+export async function fetchScores(opts: ScoresQuery = {}): Promise<ScoreRow[]> {
+  return (await fetchScoresPage(opts)).rows;
+}
+
+// Una página de /scores; nextCursor se pasa como `cursor` para la siguiente
+export async function fetchScoresPage(
+  opts: ScoresQuery = {}
+): Promise<{ rows: ScoreRow[]; nextCursor: string | null }> {
+  const { limit = 50, source = "score3", ...filters } = opts;
+  const res = await API.get("/scores", {
+    params: { limit, source, ...filters },
   });
-  return Array.isArray(data) ? data : [];
+  return {
+    rows: Array.isArray(res.data) ? res.data : [],
+    nextCursor: res.headers["x-next-cursor"] ?? null,
+  };
+}
+
+// URL de descarga del historial completo (NDJSON o CSV) con los filtros de /scores
+export function exportScoresUrl(
+  opts: Omit<ScoresQuery, "limit" | "cursor"> & { format?: "ndjson" | "csv" } = {}
+): string {
+  const params = new URLSearchParams();
+  for (const [k, v] of Object.entries({ format: "csv", ...opts })) {
+    if (v !== undefined && v !== null && v !== "") params.set(k, String(v));
+  }
+  return `${API.defaults.baseURL}/scores/export?${params.toString()}`;
 }
 
 // Song Ranking
 export async function fetchSongRanking(
   songId: number | string,
-  opts: { source?: "score3" | "hiscore3"; limit?: number } = {}
+  opts: { source?: "score3" | "hiscore3"; limit?: number; difficulty?: number } = {}
 ): Promise<SongRankingResponse> {
-  const { source = "score3", limit = 5 } = opts;
+  const { source = "score3", limit = 5, difficulty } = opts;
   const { data } = await API.get("/scores/ranking", {
-    params: { songId, source, limit },
+    params: { songId, source, limit, difficulty },
   });
   return {
     songId: data?.songId,
@@ -96,8 +141,177 @@ export async function fetchSongRanking(
   };
 }
 
+// Rankings de varias canciones en un solo request
+export async function fetchSongRankings(
+  songIds: Array<number | string>,
+  opts: {
+    source?: "score3" | "hiscore3";
+    limit?: number;
+    modes?: Array<"S" | "D">;
+    difficulties?: number[];
+  } = {}
+): Promise<SongRankingsResponse> {
+  const { source = "score3", limit = 5, modes, difficulties } = opts;
+  const { data } = await API.get("/scores/rankings", {
+    params: {
+      songIds: songIds.join(","),
+      source,
+      limit,
+      modes: modes?.length ? modes.join(",") : undefined,
+      difficulties: difficulties?.length ? difficulties.join(",") : undefined,
+    },
+  });
+  return {
+    source: data?.source ?? source,
+    songMeta: data?.songMeta || {},
+    rankings: Array.isArray(data?.rankings) ? data.rankings : [],
+  };
+}
+
+// Feed en vivo (SSE): plays nuevos y cambios de posición. Devuelve la función para cerrar.
+export type LiveEvent =
+  | { type: "score"; version: number; row: ScoreRow }
+  | {
+      type: "position";
+      version: number;
+      source: "score3" | "hiscore3";
+      songId: number;
+      mode: "S" | "D";
+      difficulty: number | null;
+      dancerName: string;
+      from: number | null;
+      to: number;
+      score: number;
+    }
+  | { type: "resync"; version: number };
+
+export function openLiveFeed(
+  onEvent: (ev: LiveEvent) => void,
+  opts: { dancer?: string; songId?: number } = {}
+): () => void {
+  const params = new URLSearchParams();
+  if (opts.dancer) params.set("dancer", opts.dancer);
+  if (opts.songId != null) params.set("songId", String(opts.songId));
+  const es = new EventSource(`${API.defaults.baseURL}/live/sse?${params.toString()}`, {
+    withCredentials: true,
+  });
+  for (const type of ["score", "position", "resync"]) {
+    es.addEventListener(type, (e) => onEvent(JSON.parse((e as MessageEvent).data)));
+  }
+  return () => es.close();
+}
+
 // Dancers Summary
-export async function fetchDancersSummary(): Promise<DancerSummaryRow[]> {
-  const { data } = await API.get("/stats/dancers");
+export async function fetchDancersSummary(
+  source: "score3" | "hiscore3" = "score3"
+): Promise<DancerSummaryRow[]> {
+  const { data } = await API.get("/stats/dancers", { params: { source } });
   return Array.isArray(data?.rows) ? data.rows : [];
 }
+
+// Progreso por nivel (lámparas / notas del mejor score de cada chart)
+export type LevelProgressRow = {
+  level: number;
+  charts: number;
+  played: number;
+  lamps: { MFC: number; PFC: number; GFC: number; FC: number };
+  grades: Record<string, number>;
+  pct: Record<string, number | null>;
+};
+
+export async function fetchLevelProgress(
+  dancer: string,
+  opts: { source?: "score3" | "hiscore3"; style?: "S" | "D" } = {}
+): Promise<LevelProgressRow[]> {
+  const { source = "score3", style } = opts;
+  const { data } = await API.get("/stats/levels", { params: { dancer, source, style } });
+  return Array.isArray(data?.levels) ? data.levels : [];
+}
+
+export type ActivityResponse = {
+  bucket: "hour" | "day" | "week";
+  start: number | null;
+  end: number | null;
+  total: number;
+  series: { start: number; count: number }[];
+};
+
+export async function fetchActivity(
+  opts: {
+    bucket?: "hour" | "day" | "week";
+    start?: number;
+    end?: number;
+    dancer?: string;
+    songId?: number;
+    source?: "score3" | "hiscore3";
+  } = {}
+): Promise<ActivityResponse> {
+  const { bucket = "day", source = "score3", ...rest } = opts;
+  const { data } = await API.get("/stats/activity", { params: { bucket, source, ...rest } });
+  return data;
+}
+
+export type GhostSide = {
+  dancerName: string;
+  score: number;
+  mode: "S" | "D";
+  ghostId: number;
+  steps: number[];
+  counts: Record<string, number>;
+};
+
+export type GhostCompareResponse = {
+  songId: number;
+  mode: "S" | "D";
+  difficulty: number;
+  source: "score3" | "hiscore3";
+  a: GhostSide;
+  b: GhostSide;
+  compared: number;
+  different: number;
+  firstDifference: number | null;
+  diffs: [number, number, number][];
+};
+
+export async function compareGhosts(params: {
+  songId: number;
+  a: string;
+  b: string;
+  mode?: "S" | "D";
+  difficulty: number;
+  source?: "score3" | "hiscore3";
+}): Promise<GhostCompareResponse> {
+  const { data } = await API.get("/ghosts/compare", { params });
+  return data;
+}
+
+export type EventProgress = {
+  eventId: number;
+  eventNo: number | null;
+  eventType: number | null;
+  compTime: number | null;
+  saveData: number | null;
+  updatedAt: number | null;
+};
+
+export async function fetchDancerEvents(dancer: string): Promise<EventProgress[]> {
+  const { data } = await API.get("/events", { params: { dancer } });
+  return Array.isArray(data?.events) ? data.events : [];
+}
+
+export type LeagueStanding = {
+  leagueId: number;
+  class: number | null;
+  promoteRank: number | null;
+  promoteScore: number | null;
+  demoteRank: number | null;
+  demoteScore: number | null;
+  joinNum: number | null;
+  ended: boolean;
+  dancerName: string | null;
+};
+
+export async function fetchLeagueStandings(leagueId: number): Promise<LeagueStanding[]> {
+  const { data } = await API.get(`/leagues/${leagueId}`);
+  return Array.isArray(data?.standings) ? data.standings : [];
+}